@@ -1,18 +1,101 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
 from django.utils.html import format_html
+from django.db.models import Case, CharField, F, Value, When
+from django.db.models.functions import Concat, Trim
 from .models import (
     CustomUser, Animal, Reservation, 
-    SupportRequest, Adoption, Donation
+    SupportRequest, Adoption, Donation, Job
 )
+from .pagination import UncountedPaginator, EstimatedCountPaginator
+from .admin_search import filter_by_search_document
+from .exports import export_response
+from .forms import AnimalImportUploadForm
+from .imports import ImportFileError, detect_format, import_animals
+from .services import (
+    set_animal_status, cancel_reservations,
+    approve_adoptions, reject_adoptions, set_donation_status
+)
+
+
+def is_autocomplete_request(request):
+    match = getattr(request, 'resolver_match', None)
+    return match is not None and match.url_name == 'autocomplete'
+
+
+class AutocompleteMixin:
+    """
+    Быстрые ответы для виджетов автодополнения (autocomplete_fields).
+
+    В запросах автодополнения поиск идет по префиксу только по полям
+    autocomplete_search_fields (для них есть индексы), а страницы
+    отдаются без COUNT(*).
+    """
+    autocomplete_search_fields = []
+
+    def get_search_fields(self, request):
+        if self.autocomplete_search_fields and is_autocomplete_request(request):
+            return self.autocomplete_search_fields
+        return super().get_search_fields(request)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if is_autocomplete_request(request):
+            return UncountedPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+
+class EstimatedCountMixin:
+    """
+    Оценка количества строк вместо точного COUNT(*) в списке объектов.
+    Для больших таблиц, которые только растут.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class SearchDocumentMixin:
+    """
+    Поиск в списке объектов по денормализованному полю search_document
+    (см. admin_search.py) вместо icontains по каждому из search_fields
+    с JOIN связанных таблиц. search_fields нужны, чтобы показать строку поиска.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or is_autocomplete_request(request):
+            return super().get_search_results(request, queryset, search_term)
+        return filter_by_search_document(queryset, search_term), False
+
+
+class ExportMixin:
+    """
+    Действия "Выгрузить в CSV" и "Выгрузить в XLSX" для отмеченных строк
+    (или всех по фильтру). Файл отдается потоком, см. exports.py;
+    export_name — ключ exports.EXPORTS.
+    """
+    export_name = None
+
+    def export_csv(self, request, queryset):
+        """Выгрузить в CSV"""
+        return export_response(self.export_name, queryset, 'csv', request)
+    export_csv.short_description = 'Выгрузить в CSV'
+
+    def export_xlsx(self, request, queryset):
+        """Выгрузить в XLSX"""
+        return export_response(self.export_name, queryset, 'xlsx', request)
+    export_xlsx.short_description = 'Выгрузить в XLSX'
 
 
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(SearchDocumentMixin, AutocompleteMixin, UserAdmin):
     """Админка для пользователей"""
     list_display = ['username', 'email', 'first_name', 'last_name', 'phone', 'is_verified', 'created_at']
     list_filter = ['is_staff', 'is_superuser', 'is_verified', 'created_at']
     search_fields = ['username', 'email', 'first_name', 'last_name', 'phone']
+    autocomplete_search_fields = ['^username', '^email', '^first_name', '^last_name']
     ordering = ['-created_at']
     
     fieldsets = UserAdmin.fieldsets + (
@@ -29,7 +112,7 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(Animal)
-class AnimalAdmin(admin.ModelAdmin):
+class AnimalAdmin(AutocompleteMixin, admin.ModelAdmin):
     """Админка для животных"""
     list_display = [
         'name', 'animal_type', 'breed', 'age', 'gender', 
@@ -37,6 +120,7 @@ class AnimalAdmin(admin.ModelAdmin):
     ]
     list_filter = ['animal_type', 'age', 'gender', 'size', 'status', 'vaccinated', 'sterilized']
     search_fields = ['name', 'breed', 'description']
+    autocomplete_search_fields = ['^name', '^breed']
     ordering = ['-created_at']
     readonly_fields = ['photo_preview', 'created_at', 'updated_at']
     
@@ -58,9 +142,11 @@ class AnimalAdmin(admin.ModelAdmin):
     def photo_preview(self, obj):
         """Превью фото в админке"""
         if obj.photo:
+            urls = obj.photo_urls['admin']
             return format_html(
-                '<img src="{}" style="max-width: 200px; max-height: 200px;" />',
-                obj.photo.url
+                '<picture><source srcset="{}" type="image/webp">'
+                '<img src="{}" style="max-width: 200px; max-height: 200px;" /></picture>',
+                urls['webp'], urls['jpeg']
             )
         return format_html('<span>{}</span>', obj.get_emoji())
     
@@ -70,25 +156,65 @@ class AnimalAdmin(admin.ModelAdmin):
     
     def mark_as_available(self, request, queryset):
         """Пометить как доступных"""
-        updated = queryset.update(status='available')
+        updated = set_animal_status(queryset, 'available')
         self.message_user(request, f'{updated} животных помечены как доступные')
     mark_as_available.short_description = 'Пометить как доступных'
     
     def mark_as_adopted(self, request, queryset):
         """Пометить как усыновленных"""
-        updated = queryset.update(status='adopted')
+        updated = set_animal_status(queryset, 'adopted')
         self.message_user(request, f'{updated} животных помечены как усыновленные')
     mark_as_adopted.short_description = 'Пометить как усыновленных'
 
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='shelter_animal_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Загрузка файла с животными (см. imports.py)"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        if request.method == 'POST':
+            form = AnimalImportUploadForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+                photos = form.cleaned_data['photos']
+                try:
+                    result = import_animals(
+                        upload.file, detect_format(upload.name),
+                        photos=photos.file if photos else None,
+                        dry_run=form.cleaned_data['dry_run'],
+                    )
+                except ImportFileError as exc:
+                    form.add_error(None, str(exc))
+                else:
+                    if not result.dry_run:
+                        self.message_user(request, f'Добавлено животных: {result.created}')
+        else:
+            form = AnimalImportUploadForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Импорт животных',
+            'opts': self.model._meta,
+            'form': form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/shelter/animal/import.html', context)
+
 
 @admin.register(Reservation)
-class ReservationAdmin(admin.ModelAdmin):
+class ReservationAdmin(ExportMixin, SearchDocumentMixin, EstimatedCountMixin, admin.ModelAdmin):
     """Админка для бронирований"""
     list_display = [
         'id', 'animal', 'name', 'phone', 'email', 
         'visit_date', 'status', 'created_at'
     ]
     list_filter = ['status', 'visit_date', 'created_at']
+    list_select_related = ['animal']
+    autocomplete_fields = ['animal', 'user']
     search_fields = ['name', 'phone', 'email', 'animal__name']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
@@ -108,7 +234,8 @@ class ReservationAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['confirm_reservation', 'cancel_reservation']
+    export_name = 'reservations'
+    actions = ['confirm_reservation', 'cancel_reservation', 'export_csv', 'export_xlsx']
     
     def confirm_reservation(self, request, queryset):
         """Подтвердить бронирование"""
@@ -118,23 +245,21 @@ class ReservationAdmin(admin.ModelAdmin):
     
     def cancel_reservation(self, request, queryset):
         """Отменить бронирование"""
-        updated = queryset.update(status='cancelled')
         # Вернуть животных в статус "доступно"
-        for reservation in queryset:
-            reservation.animal.status = 'available'
-            reservation.animal.save()
+        updated = cancel_reservations(queryset)
         self.message_user(request, f'{updated} бронирований отменено')
     cancel_reservation.short_description = 'Отменить бронирование'
 
 
 @admin.register(SupportRequest)
-class SupportRequestAdmin(admin.ModelAdmin):
+class SupportRequestAdmin(SearchDocumentMixin, EstimatedCountMixin, admin.ModelAdmin):
     """Админка для обращений в поддержку"""
     list_display = [
         'id', 'name', 'email', 'subject', 
         'status', 'created_at'
     ]
     list_filter = ['subject', 'status', 'created_at']
+    autocomplete_fields = ['user']
     search_fields = ['name', 'email', 'message']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
@@ -170,13 +295,15 @@ class SupportRequestAdmin(admin.ModelAdmin):
 
 
 @admin.register(Adoption)
-class AdoptionAdmin(admin.ModelAdmin):
+class AdoptionAdmin(ExportMixin, SearchDocumentMixin, admin.ModelAdmin):
     """Админка для усыновлений"""
     list_display = [
         'id', 'animal', 'user', 'status', 
         'adoption_date', 'created_at'
     ]
     list_filter = ['status', 'adoption_date', 'created_at']
+    list_select_related = ['animal', 'user']
+    autocomplete_fields = ['animal', 'user']
     search_fields = ['animal__name', 'user__first_name', 'user__last_name', 'user__email']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
@@ -193,37 +320,35 @@ class AdoptionAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['approve_adoption', 'reject_adoption']
+    export_name = 'adoptions'
+    actions = ['approve_adoption', 'reject_adoption', 'export_csv', 'export_xlsx']
     
     def approve_adoption(self, request, queryset):
         """Одобрить усыновление"""
-        updated = queryset.update(status='approved')
         # Обновить статус животных
-        for adoption in queryset:
-            adoption.animal.status = 'adopted'
-            adoption.animal.save()
+        updated = approve_adoptions(queryset)
         self.message_user(request, f'{updated} усыновлений одобрено')
     approve_adoption.short_description = 'Одобрить усыновление'
     
     def reject_adoption(self, request, queryset):
         """Отклонить усыновление"""
-        updated = queryset.update(status='rejected')
         # Вернуть животных в статус "доступно"
-        for adoption in queryset:
-            adoption.animal.status = 'available'
-            adoption.animal.save()
+        updated = reject_adoptions(queryset)
         self.message_user(request, f'{updated} усыновлений отклонено')
     reject_adoption.short_description = 'Отклонить усыновление'
 
 
 @admin.register(Donation)
-class DonationAdmin(admin.ModelAdmin):
+class DonationAdmin(ExportMixin, SearchDocumentMixin, EstimatedCountMixin, admin.ModelAdmin):
     """Админка для пожертвований"""
     list_display = [
         'id', 'get_donor_name', 'amount', 'payment_status', 
         'is_anonymous', 'created_at'
     ]
     list_filter = ['payment_status', 'is_anonymous', 'created_at']
+    # Donation.__str__ (подпись флажка действия) обращается к user
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     search_fields = ['name', 'email', 'user__first_name', 'user__last_name', 'transaction_id']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
@@ -240,24 +365,58 @@ class DonationAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # Имя донора вычисляется в том же запросе, без обращения к obj.user
+        return super().get_queryset(request).annotate(
+            donor_name=Case(
+                When(is_anonymous=True, then=Value('Аноним')),
+                When(user__isnull=False, then=Trim(Concat(
+                    'user__first_name', Value(' '), 'user__last_name'
+                ))),
+                default=F('name'),
+                output_field=CharField()
+            )
+        )
+    
     def get_donor_name(self, obj):
         """Получить имя донора"""
-        if obj.is_anonymous:
-            return 'Аноним'
-        if obj.user:
-            return obj.user.get_full_name()
-        return obj.name
+        return obj.donor_name
     get_donor_name.short_description = 'Донор'
+    get_donor_name.admin_order_field = 'donor_name'
     
-    actions = ['mark_as_completed']
+    export_name = 'donations'
+    actions = ['mark_as_completed', 'export_csv', 'export_xlsx']
     
     def mark_as_completed(self, request, queryset):
         """Пометить как оплаченные"""
-        updated = queryset.update(payment_status='completed')
+        updated = set_donation_status(queryset, 'completed')
         self.message_user(request, f'{updated} пожертвований помечены как оплаченные')
     mark_as_completed.short_description = 'Пометить как оплаченные'
 
 
+@admin.register(Job)
+class JobAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    """Админка для фоновых задач"""
+    list_display = ['task', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at']
+    list_filter = ['status', 'task']
+    readonly_fields = [
+        'task', 'payload', 'attempts', 'locked_at', 'locked_by',
+        'last_error', 'created_at', 'updated_at'
+    ]
+    
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        """Повторить задачи"""
+        updated = queryset.exclude(status='running').update(
+            status='pending',
+            run_at=timezone.now(),
+            attempts=0
+        )
+        self.message_user(request, f'{updated} задач возвращены в очередь')
+    retry_jobs.short_description = 'Повторить'
+
+
 # Настройка админ-панели
 admin.site.site_header = 'Администрирование приюта "Верные друзья"'
 admin.site.site_title = 'Админ-панель приюта'
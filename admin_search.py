@@ -0,0 +1,91 @@
+"""
+Быстрый поиск в админке.
+
+У моделей с поиском в админке есть денормализованное поле search_document:
+значения полей поиска (в том числе полей связанных моделей) через пробел.
+В PostgreSQL по UPPER(search_document) построен триграммный GIN-индекс
+(pg_trgm), поэтому icontains не сканирует таблицу и не делает JOIN.
+"""
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils.text import smart_split, unescape_string_literal
+
+from .models import CustomUser, Reservation, SupportRequest, Adoption, Donation
+
+
+# Поля, из которых собирается search_document (совпадают с search_fields в админке)
+SEARCH_DOCUMENT_FIELDS = {
+    CustomUser: ['username', 'email', 'first_name', 'last_name', 'phone'],
+    Reservation: ['name', 'phone', 'email', 'animal__name'],
+    SupportRequest: ['name', 'email', 'message'],
+    Adoption: ['animal__name', 'user__first_name', 'user__last_name', 'user__email'],
+    Donation: ['name', 'email', 'user__first_name', 'user__last_name', 'transaction_id'],
+}
+
+
+def local_fields(model):
+    return {path for path in SEARCH_DOCUMENT_FIELDS[model] if '__' not in path}
+
+
+def dependent_documents(source):
+    """
+    Модели, в чьи search_document попадают поля модели source.
+
+    Возвращает [(модель, имя связи, {поля source})].
+    """
+    dependents = []
+    for model, paths in SEARCH_DOCUMENT_FIELDS.items():
+        relations = {}
+        for path in paths:
+            if '__' not in path:
+                continue
+            relation, field = path.split('__', 1)
+            if model._meta.get_field(relation).related_model is source:
+                relations.setdefault(relation, set()).add(field)
+        dependents.extend((model, relation, fields) for relation, fields in relations.items())
+    return dependents
+
+
+def build_search_document(instance):
+    """Собрать search_document для экземпляра (связанные объекты загружаются при необходимости)"""
+    values = []
+    for path in SEARCH_DOCUMENT_FIELDS[type(instance)]:
+        value = instance
+        for attr in path.split('__'):
+            value = getattr(value, attr, None) if value is not None else None
+        values.append(str(value) if value is not None else '')
+    return ' '.join(values)
+
+
+def search_document_expression(model):
+    """То же, что build_search_document, но SQL-выражением для массового UPDATE"""
+    parts = []
+    for path in SEARCH_DOCUMENT_FIELDS[model]:
+        if '__' in path:
+            relation, field = path.split('__', 1)
+            foreign_key = model._meta.get_field(relation)
+            value = Subquery(
+                foreign_key.related_model._default_manager.filter(
+                    pk=OuterRef(foreign_key.attname)
+                ).values(field)[:1]
+            )
+        else:
+            value = F(path)
+        parts += [Coalesce(value, Value(''), output_field=TextField()), Value(' ')]
+    return Concat(*parts[:-1], output_field=TextField())
+
+
+def refresh_search_documents(queryset):
+    """Пересчитать search_document одним UPDATE"""
+    return queryset.update(search_document=search_document_expression(queryset.model))
+
+
+def filter_by_search_document(queryset, search_term):
+    """Каждое слово запроса должно встречаться в search_document"""
+    for bit in smart_split(search_term):
+        if bit[:1] in ('"', "'") and bit[-1:] == bit[:1]:
+            bit = unescape_string_literal(bit)
+        bit = bit.strip()
+        if bit:
+            queryset = queryset.filter(search_document__icontains=bit)
+    return queryset
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ShelterConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'shelter'
+    verbose_name = 'Приют "Верные друзья"'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import tasks  # noqa: F401
@@ -0,0 +1,81 @@
+"""
+Вход по email.
+
+Пользователь ищется одним запросом по уникальному индексу lower(email)
+(ограничение user_email_lower_unique), после чего проверяется пароль.
+Подключается в настройках проекта:
+
+    AUTHENTICATION_BACKENDS = [
+        'shelter.auth_backends.EmailBackend',
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+
+Без этой настройки authenticate_by_email() ищет пользователя по email и
+проверяет пароль через ModelBackend по имени пользователя (два запроса),
+так что вход работает и со стандартными AUTHENTICATION_BACKENDS.
+"""
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+from .models import CustomUser
+
+
+def users_with_email(email, queryset=None):
+    """
+    Пользователи с таким email без учета регистра.
+
+    Условие повторяет частичный индекс user_email_lower_unique, иначе
+    планировщик не сможет его использовать.
+    """
+    if queryset is None:
+        queryset = CustomUser._default_manager.all()
+    return queryset.alias(email_lower=Lower('email')).filter(
+        email_lower=email.lower()
+    ).exclude(email='')
+
+
+class EmailBackend(ModelBackend):
+    """Аутентификация по email и паролю: authenticate(request, email=..., password=...)"""
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        try:
+            user = users_with_email(email).get()
+        except CustomUser.DoesNotExist:
+            # Хешируем пароль и для несуществующего email, чтобы время ответа
+            # не выдавало, зарегистрирован ли адрес
+            CustomUser().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+EMAIL_BACKEND = f'{EmailBackend.__module__}.{EmailBackend.__qualname__}'
+
+
+def email_backend_enabled():
+    return EMAIL_BACKEND in settings.AUTHENTICATION_BACKENDS
+
+
+def authenticate_by_email(request, email, password):
+    """Пользователь с таким email и паролем или None — через EmailBackend, если он подключен"""
+    if email_backend_enabled():
+        return authenticate(request, email=email, password=password)
+    if not email or password is None:
+        return None
+    username = users_with_email(email).values_list('username', flat=True).first()
+    if username is None:
+        CustomUser().set_password(password)
+        return None
+    return authenticate(request, username=username, password=password)
+
+
+def session_backend():
+    """Бэкенд для login() без authenticate(): EmailBackend, если подключен, иначе первый из настроек"""
+    if email_backend_enabled():
+        return EMAIL_BACKEND
+    return settings.AUTHENTICATION_BACKENDS[0]
@@ -0,0 +1,291 @@
+"""
+Живые обновления статусов животных (server-sent events).
+
+Код, меняющий Animal.status, вызывает publish_status_changes(). После
+фиксации транзакции события попадают в хаб процесса (StatusHub), который
+раздает их всем открытым SSE-соединениям этого процесса. Соединение —
+это одна asyncio.Queue, без потока и без соединения с базой, поэтому
+один ASGI-воркер держит тысячи ожидающих клиентов.
+
+Обработчик запросов Django держит на каждый запрос отдельный поток, пока
+не закончится ответ (сигнал request_started выполняется через
+sync_to_async), поэтому в продакшне поток отдается ASGI-приложением
+status_stream_app в обход Django:
+
+    application = with_status_stream(get_asgi_application())
+
+Представление api_animal_status_stream отдает тот же поток и подходит для
+небольшого числа клиентов.
+
+Поток включается настройкой SHELTER_LIVE_STATUS = True и работает только
+под ASGI: под WSGI (gunicorn с синхронными воркерами, runserver) каждое
+соединение навсегда заняло бы воркер. Без настройки главная страница не
+подписывается на поток, а URL потока отвечает 204 — EventSource на такой
+ответ не переподключается.
+
+При SHELTER_LIVE_NOTIFY = True и PostgreSQL события рассылаются через
+NOTIFY: каждый процесс слушает канал (LISTEN) в отдельном потоке и
+передает полученное в свой хаб, так что клиенты всех воркеров получают
+изменения, сделанные в любом из них.
+"""
+import asyncio
+import json
+import logging
+import selectors
+import threading
+import time
+
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.urls import reverse
+
+from .models import Animal
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'shelter_animal_status'
+
+# NOTIFY ограничивает сообщение 8000 байт
+NOTIFY_BATCH = 100
+
+
+def stream_enabled():
+    return getattr(settings, 'SHELTER_LIVE_STATUS', False)
+
+
+def notify_enabled(using=DEFAULT_DB_ALIAS):
+    return (
+        getattr(settings, 'SHELTER_LIVE_NOTIFY', False)
+        and connections[using].vendor == 'postgresql'
+    )
+
+
+class StatusHub:
+    """Рассылка событий подписчикам-очередям в пределах процесса (потокобезопасно)"""
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Очередь событий для текущего event loop"""
+        queue = asyncio.Queue(self.maxsize)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def publish(self, events):
+        """Передать события всем подписчикам; можно вызывать из любого потока"""
+        if not events:
+            return
+        by_loop = {}
+        with self._lock:
+            for queue, loop in self._subscribers.items():
+                by_loop.setdefault(loop, []).append(queue)
+        for loop, queues in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, queues, events)
+            except RuntimeError:
+                # Event loop уже закрыт
+                for queue in queues:
+                    self.unsubscribe(queue)
+
+    @staticmethod
+    def _deliver(queues, events):
+        for queue in queues:
+            for event in events:
+                # Медленный клиент теряет самые старые события, а не тормозит остальных
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+
+hub = StatusHub()
+
+
+def status_events(changes):
+    labels = dict(Animal.STATUS_CHOICES)
+    return [
+        {'id': pk, 'status': status, 'label': labels.get(status, status)}
+        for pk, status in changes
+    ]
+
+
+def publish_status_changes(changes, using=DEFAULT_DB_ALIAS):
+    """
+    Сообщить о новых статусах животных: changes — [(pk, status)].
+
+    События уходят только после фиксации текущей транзакции.
+    """
+    events = status_events(changes)
+    if not events:
+        return
+    if notify_enabled(using):
+        # NOTIFY внутри транзакции доставляется слушателям при COMMIT
+        with connections[using].cursor() as cursor:
+            for start in range(0, len(events), NOTIFY_BATCH):
+                cursor.execute(
+                    'SELECT pg_notify(%s, %s)',
+                    [CHANNEL, json.dumps(events[start:start + NOTIFY_BATCH])]
+                )
+    else:
+        transaction.on_commit(lambda: hub.publish(events), using=using)
+
+
+class NotifyListener(threading.Thread):
+    """Поток, который слушает канал PostgreSQL и передает события в хаб"""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        super().__init__(name='shelter-status-listener', daemon=True)
+        self.using = using
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception('Ошибка LISTEN %s, переподключение', CHANNEL)
+                time.sleep(5)
+
+    def listen(self):
+        wrapper = connections[self.using]
+        # Отдельное соединение psycopg2 вне пула Django
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            # epoll вместо select(): номер сокета больше 1024 при тысячах клиентов
+            selector = selectors.DefaultSelector()
+            selector.register(conn, selectors.EVENT_READ)
+            while True:
+                if not selector.select(timeout=30):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        hub.publish(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning('Некорректное сообщение в %s: %s', CHANNEL, notify.payload)
+        finally:
+            conn.close()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener(using=DEFAULT_DB_ALIAS):
+    """Запустить поток LISTEN в этом процессе (один раз), если включен NOTIFY"""
+    global _listener
+    if _listener is not None or not notify_enabled(using):
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = NotifyListener(using)
+            _listener.start()
+
+
+# Первичный ключ — bigint; большие числа база отвергает с ошибкой
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_ids(value):
+    """'1,2,3' -> {1, 2, 3}; пустая строка -> None (все животные); ValueError для не-id"""
+    ids = {int(pk) for pk in (value or '').split(',') if pk.strip()}
+    if any(pk < 1 or pk > MAX_ID for pk in ids):
+        raise ValueError('id вне допустимого диапазона')
+    return ids or None
+
+
+async def stream_status_events(ids=None, keepalive=25):
+    """
+    Поток SSE: событие status на каждое изменение статуса.
+
+    ids — множество id животных, о которых нужно сообщать (None — обо всех).
+    Раз в keepalive секунд отправляется комментарий, чтобы прокси не закрывали соединение.
+    """
+    queue = hub.subscribe()
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if ids is None or event['id'] in ids:
+                yield f'event: status\ndata: {json.dumps(event, ensure_ascii=False)}\n\n'
+    finally:
+        hub.unsubscribe(queue)
+
+
+async def status_stream_app(scope, receive, send):
+    """ASGI-приложение с потоком SSE: без потока на соединение и без middleware Django"""
+    if not stream_enabled():
+        await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    try:
+        ids = parse_ids(parse_qs(scope['query_string'].decode()).get('ids', [''])[0])
+    except ValueError:
+        await send({'type': 'http.response.start', 'status': 400, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    ensure_listener()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    events = stream_status_events(ids)
+
+    async def pump():
+        async for chunk in events:
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await events.aclose()
+
+
+def with_status_stream(application):
+    """Отдавать URL api_animal_status_stream через status_stream_app, остальное — application"""
+    path = None
+
+    async def router(scope, receive, send):
+        nonlocal path
+        if scope['type'] == 'http':
+            if path is None:
+                path = reverse('api_animal_status_stream')
+            if scope['path'] == path:
+                return await status_stream_app(scope, receive, send)
+        return await application(scope, receive, send)
+
+    return router
@@ -0,0 +1,464 @@
+"""
+Потоковая выгрузка пожертвований, бронирований и усыновлений в CSV и XLSX.
+
+Строки читаются через values_list() — только нужные столбцы, имена
+животных и пользователей приходят JOIN в том же запросе — и .iterator():
+в PostgreSQL это серверный курсор, который отдает по chunk_size строк.
+Запрос идет внутри транзакции: вне ее курсор создается WITH HOLD, и
+PostgreSQL сначала выполняет запрос целиком. Порядок — по первичному
+ключу (то есть по времени создания), чтобы не сортировать таблицу до
+первой строки. Файл собирается по мере чтения: первые байты уходят
+сразу, память не зависит от числа строк.
+
+Под ASGI StreamingHttpResponse с синхронным генератором сначала собирает
+его целиком в список, поэтому там ответ получает асинхронный генератор
+async_chunks(): каждая порция читается через sync_to_async в одном и том же
+потоке (курсор и транзакция привязаны к соединению потока).
+
+Текст из публичных форм (имена, комментарии) в CSV не должен стать
+формулой в Excel: ячейки, начинающиеся с =, +, -, @, табуляции или
+возврата каретки, получают префикс '. Телефоны и числа ("+7 999 123-45-67",
+"-5") формулой опасной не станут и пишутся как есть. В XLSX текст пишется inline-строкой
+и формулой не бывает.
+
+XLSX пишется без сторонних библиотек: ZIP в поток (zipfile пишет и в
+файл без seek), лист — пачками строк, текст — inline-строками без общей
+таблицы. На листе не больше XLSX_MAX_ROWS строк, дальше идет следующий.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain, islice
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import models, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Adoption, Donation, Reservation
+
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Строк в одной записи в файл или архив
+ROWS_PER_WRITE = 1000
+
+XLSX_MAX_ROWS = 1_048_576
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Первые символы ячейки CSV, с которых Excel начинает формулу
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Телефон или число: префикс ' не нужен
+CSV_PLAIN_NUMBER = re.compile(r'[+-]?[\d ()-]+')
+
+# Символы, недопустимые в XML
+XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Индексы стилей из XLSX_STYLES
+STYLE_DATE = 1
+STYLE_DATETIME = 2
+STYLE_HEADER = 3
+
+
+class Export:
+    """Выгружаемая модель: столбцы — (путь для values_list, заголовок)"""
+
+    def __init__(self, model, columns, status_field='status'):
+        self.model = model
+        self.columns = columns
+        self.status_field = status_field
+
+    @property
+    def title(self):
+        return str(self.model._meta.verbose_name_plural)
+
+    @property
+    def headers(self):
+        return [header for _, header in self.columns]
+
+    def field(self, lookup):
+        opts = self.model._meta
+        *relations, name = lookup.split('__')
+        for relation in relations:
+            opts = opts.get_field(relation).related_model._meta
+        return opts.get_field(name)
+
+    def rows(self, queryset, file_format, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Строки значений, готовые для записи в файл формата file_format"""
+        lookups = [lookup for lookup, _ in self.columns]
+        converters = [field_converter(self.field(lookup), file_format) for lookup in lookups]
+        pairs = [(index, convert) for index, convert in enumerate(converters) if convert is not None]
+        for row in queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size):
+            row = list(row)
+            for index, convert in pairs:
+                if row[index] is not None:
+                    row[index] = convert(row[index])
+            yield row
+
+
+EXPORTS = {
+    'donations': Export(Donation, [
+        ('id', 'ID'),
+        ('created_at', 'Дата создания'),
+        ('amount', 'Сумма'),
+        ('payment_status', 'Статус платежа'),
+        ('transaction_id', 'ID транзакции'),
+        ('is_anonymous', 'Анонимно'),
+        ('name', 'Имя донора'),
+        ('email', 'Email'),
+        ('user__username', 'Пользователь'),
+        ('user__first_name', 'Имя пользователя'),
+        ('user__last_name', 'Фамилия пользователя'),
+        ('user__email', 'Email пользователя'),
+    ], status_field='payment_status'),
+    'reservations': Export(Reservation, [
+        ('id', 'ID'),
+        ('created_at', 'Дата создания'),
+        ('status', 'Статус'),
+        ('visit_date', 'Дата посещения'),
+        ('animal_id', 'ID животного'),
+        ('animal__name', 'Животное'),
+        ('animal__animal_type', 'Вид'),
+        ('name', 'Имя'),
+        ('phone', 'Телефон'),
+        ('email', 'Email'),
+        ('user__username', 'Пользователь'),
+        ('comment', 'Комментарий'),
+    ]),
+    'adoptions': Export(Adoption, [
+        ('id', 'ID'),
+        ('created_at', 'Дата создания'),
+        ('status', 'Статус'),
+        ('adoption_date', 'Дата усыновления'),
+        ('animal_id', 'ID животного'),
+        ('animal__name', 'Животное'),
+        ('animal__animal_type', 'Вид'),
+        ('user__username', 'Пользователь'),
+        ('user__first_name', 'Имя усыновителя'),
+        ('user__last_name', 'Фамилия усыновителя'),
+        ('user__email', 'Email усыновителя'),
+        ('user__phone', 'Телефон усыновителя'),
+        ('notes', 'Примечания'),
+    ]),
+}
+
+
+def datetime_converter(file_format):
+    """
+    Время в часовом поясе сайта без tzinfo (Excel часовых поясов не знает);
+    пояс берется один раз, timezone.localtime() на каждую строку заметно дороже.
+    """
+    zone = timezone.get_current_timezone()
+
+    def local(value):
+        if timezone.is_aware(value):
+            value = value.astimezone(zone)
+        return value.replace(tzinfo=None)
+
+    if file_format != 'csv':
+        return local
+    return lambda value: local(value).isoformat(sep=' ', timespec='seconds')
+
+
+def csv_boolean(value):
+    # Те же значения понимает импорт (imports.BOOLEAN_VALUES)
+    return 'да' if value else 'нет'
+
+
+def csv_text(value):
+    # Защита от CSV-инъекции: Excel считает такие ячейки формулами
+    if value and value[0] in CSV_FORMULA_PREFIXES and not CSV_PLAIN_NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+
+def field_converter(field, file_format):
+    """Преобразование значения столбца или None, если значение пишется как есть"""
+    if field.choices:
+        labels = {value: str(label) for value, label in field.flatchoices}
+        return lambda value: labels.get(value, value)
+    if isinstance(field, models.DateTimeField):
+        return datetime_converter(file_format)
+    if isinstance(field, models.BooleanField) and file_format == 'csv':
+        return csv_boolean
+    if isinstance(field, (models.CharField, models.TextField)) and file_format == 'csv':
+        return csv_text
+    return None
+
+
+class Echo:
+    """Файл для csv.writer: writerow возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(headers, rows, title=None):
+    writer = csv.writer(Echo())
+    # BOM — чтобы Excel открыл UTF-8 без мастера импорта
+    yield ('\ufeff' + writer.writerow(headers)).encode('utf-8')
+    while True:
+        lines = [writer.writerow(row) for row in islice(rows, ROWS_PER_WRITE)]
+        if not lines:
+            return
+        yield ''.join(lines).encode('utf-8')
+
+
+class StreamBuffer:
+    """Файл без seek для zipfile; записанное забирается методом pop()"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def xlsx_text(ref, value):
+    if value == '':
+        return ''
+    if not value.isprintable():
+        value = XML_ILLEGAL.sub('', value)
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>'
+
+
+def xlsx_number(ref, value):
+    return f'<c r="{ref}"><v>{value}</v></c>'
+
+
+def xlsx_boolean(ref, value):
+    return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+
+
+def xlsx_datetime(ref, value):
+    serial = (value - EXCEL_EPOCH).total_seconds() / 86400
+    return f'<c r="{ref}" s="{STYLE_DATETIME}"><v>{serial:.10f}</v></c>'
+
+
+def xlsx_date(ref, value):
+    return f'<c r="{ref}" s="{STYLE_DATE}"><v>{(value - EXCEL_EPOCH.date()).days}</v></c>'
+
+
+def xlsx_empty(ref, value):
+    return ''
+
+
+# Ячейка по типу значения: словарь быстрее цепочки isinstance на каждую ячейку
+XLSX_CELLS = {
+    str: xlsx_text,
+    int: xlsx_number,
+    float: xlsx_number,
+    Decimal: xlsx_number,
+    bool: xlsx_boolean,
+    datetime: xlsx_datetime,
+    date: xlsx_date,
+    type(None): xlsx_empty,
+}
+
+
+def xlsx_other(ref, value):
+    return xlsx_text(ref, str(value))
+
+
+def xlsx_row(number, letters, values, style=None):
+    cells = ''.join([
+        XLSX_CELLS.get(type(value), xlsx_other)(f'{letter}{number}', value)
+        for letter, value in zip(letters, values)
+    ])
+    if style is not None:
+        cells = cells.replace('<c ', f'<c s="{style}" ')
+    return f'<row r="{number}">{cells}</row>'
+
+
+SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+SHEET_HEAD = (
+    f'{XML_DECLARATION}<worksheet xmlns="{SPREADSHEET_NS}">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews><sheetData>'
+)
+SHEET_TAIL = '</sheetData></worksheet>'
+
+# Стили ячеек: 0 — обычный, 1 — дата, 2 — дата и время, 3 — заголовок
+XLSX_STYLES = (
+    f'{XML_DECLARATION}<styleSheet xmlns="{SPREADSHEET_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs><cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def sheet_name(title, number):
+    # Не больше 31 символа и без []:*?/\
+    name = re.sub(r'[\[\]:*?/\\]', ' ', title)[:31]
+    if number > 1:
+        suffix = f' {number}'
+        name = name[:31 - len(suffix)] + suffix
+    return name
+
+
+def workbook_parts(title, sheets):
+    """Описание книги: имена файлов и содержимое"""
+    sheet_entries = ''.join(
+        f'<sheet name="{escape(sheet_name(title, number))}" sheetId="{number}" r:id="rId{number}"/>'
+        for number in range(1, sheets + 1)
+    )
+    sheet_relations = ''.join(
+        f'<Relationship Id="rId{number}" '
+        f'Type="{RELATIONSHIPS_NS}/worksheet" Target="worksheets/sheet{number}.xml"/>'
+        for number in range(1, sheets + 1)
+    )
+    sheet_types = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for number in range(1, sheets + 1)
+    )
+    return {
+        '[Content_Types].xml': (
+            f'{XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{sheet_types}</Types>'
+        ),
+        '_rels/.rels': (
+            f'{XML_DECLARATION}<Relationships xmlns="{PACKAGE_RELATIONSHIPS_NS}">'
+            f'<Relationship Id="rId1" Type="{RELATIONSHIPS_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/workbook.xml': (
+            f'{XML_DECLARATION}<workbook xmlns="{SPREADSHEET_NS}" xmlns:r="{RELATIONSHIPS_NS}">'
+            f'<sheets>{sheet_entries}</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            f'{XML_DECLARATION}<Relationships xmlns="{PACKAGE_RELATIONSHIPS_NS}">{sheet_relations}'
+            f'<Relationship Id="rId{sheets + 1}" Type="{RELATIONSHIPS_NS}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/styles.xml': XLSX_STYLES,
+    }
+
+
+def xlsx_chunks(headers, rows, title='Лист'):
+    buffer = StreamBuffer()
+    letters = [column_letter(index) for index in range(len(headers))]
+    rows = iter(rows)
+    sheets = 0
+    # Быстрое сжатие: при уровне по умолчанию zlib занимает треть времени выгрузки
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        while True:
+            sheets += 1
+            number = 1
+            with archive.open(f'xl/worksheets/sheet{sheets}.xml', 'w') as sheet:
+                sheet.write((SHEET_HEAD + xlsx_row(1, letters, headers, STYLE_HEADER)).encode('utf-8'))
+                yield buffer.pop()
+                while number < XLSX_MAX_ROWS:
+                    batch = list(islice(rows, min(ROWS_PER_WRITE, XLSX_MAX_ROWS - number)))
+                    if not batch:
+                        break
+                    sheet.write(''.join(
+                        xlsx_row(number + offset, letters, row) for offset, row in enumerate(batch, 1)
+                    ).encode('utf-8'))
+                    number += len(batch)
+                    if buffer.size:
+                        yield buffer.pop()
+                sheet.write(SHEET_TAIL.encode('utf-8'))
+            if number < XLSX_MAX_ROWS:
+                break
+            following = next(rows, None)
+            if following is None:
+                break
+            rows = chain([following], rows)
+        for name, content in workbook_parts(title, sheets).items():
+            archive.writestr(name, content)
+    yield buffer.pop()
+
+
+WRITERS = {
+    'csv': csv_chunks,
+    'xlsx': xlsx_chunks,
+}
+
+
+def export_chunks(name, queryset, file_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Байты файла выгрузки EXPORTS[name] по мере чтения queryset"""
+    export = EXPORTS[name]
+    with transaction.atomic(using=queryset.db):
+        yield from WRITERS[file_format](
+            export.headers, export.rows(queryset, file_format, chunk_size), export.title
+        )
+
+
+def export_filename(name, file_format):
+    return f'{name}-{timezone.localdate():%Y-%m-%d}.{file_format}'
+
+
+async def async_chunks(chunks):
+    """Синхронный генератор порций как асинхронный, без буферизации"""
+    read = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await read(chunks, None)) is not None:
+            yield chunk
+    finally:
+        # Закрыть транзакцию и курсор, если клиент оборвал скачивание
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def export_response(name, queryset, file_format, request=None):
+    chunks = export_chunks(name, queryset, file_format)
+    if isinstance(request, ASGIRequest):
+        chunks = async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(name, file_format)}"'
+    # Без буферизации в nginx: файл начинает скачиваться сразу
+    response['X-Accel-Buffering'] = 'no'
+    return response
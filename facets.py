@@ -0,0 +1,80 @@
+"""
+Фасетные счетчики для фильтров каталога.
+
+Все счетчики для текущего набора фильтров считаются одним запросом
+с условной агрегацией и кешируются. Кеш сбрасывается сменой версии
+при любом изменении животных.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Animal
+from .search import search_animals
+
+
+FACET_FIELDS = {
+    'animal_type': Animal.ANIMAL_TYPES,
+    'age': Animal.AGE_CHOICES,
+    'gender': Animal.GENDER_CHOICES,
+    'size': Animal.SIZE_CHOICES,
+}
+
+VERSION_KEY = 'animal_facets:version'
+
+
+def invalidate_facet_counts():
+    """Сбросить все закешированные счетчики"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def _cache_key(filters, search):
+    digest = hashlib.md5(
+        json.dumps([filters, search], sort_keys=True).encode()
+    ).hexdigest()
+    version = cache.get_or_set(VERSION_KEY, 1, None)
+    return f'animal_facets:{version}:{digest}'
+
+
+def get_facet_counts(filters, search=None):
+    """
+    Счетчики доступных животных для каждого значения каждого фильтра.
+
+    Для значения фильтра учитываются все остальные выбранные фильтры,
+    кроме фильтра по тому же полю. Результат: {'animal_type': {'dog': 3, ...}, ...}
+    """
+    filters = {field: filters.get(field) or None for field in FACET_FIELDS}
+    search = (search or '').strip() or None
+
+    key = _cache_key(filters, search)
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    queryset = Animal.objects.filter(status='available')
+    if search:
+        queryset = search_animals(queryset, search)
+
+    aggregates = {}
+    for field, choices in FACET_FIELDS.items():
+        others = Q(**{
+            other: value for other, value in filters.items()
+            if value and other != field
+        })
+        for value, _ in choices:
+            aggregates[f'{field}_{value}'] = Count('pk', filter=others & Q(**{field: value}))
+
+    row = queryset.order_by().aggregate(**aggregates)
+    counts = {
+        field: {value: row[f'{field}_{value}'] for value, _ in choices}
+        for field, choices in FACET_FIELDS.items()
+    }
+
+    cache.set(key, counts, getattr(settings, 'SHELTER_FACET_CACHE_TIMEOUT', 600))
+    return counts
@@ -1,11 +1,38 @@
+import operator
+from functools import reduce
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.validators import validate_email
+from django.db.models import Q
+from django.db.models.functions import Lower
 from .models import CustomUser, Reservation, SupportRequest, Animal
 
 
 class RegistrationForm(forms.ModelForm):
     """Форма регистрации пользователя"""
+    # email и username не входят в Meta.fields: их занятость проверяется
+    # одним запросом в clean(), а не отдельными проверками модели по каждому полю
+    email = forms.EmailField(
+        label='Email',
+        max_length=254,
+        # Как в модели: email можно не указывать
+        required=False,
+        widget=forms.EmailInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'your@email.com'
+        })
+    )
+    username = forms.CharField(
+        label='Имя пользователя',
+        max_length=150,
+        validators=[UnicodeUsernameValidator()],
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'username'
+        })
+    )
     password = forms.CharField(
         label='Пароль',
         widget=forms.PasswordInput(attrs={
@@ -23,9 +50,11 @@ class RegistrationForm(forms.ModelForm):
         })
     )
 
+    field_order = ['first_name', 'last_name', 'email', 'phone', 'username', 'password', 'password_confirm']
+
     class Meta:
         model = CustomUser
-        fields = ['first_name', 'last_name', 'email', 'phone', 'username']
+        fields = ['first_name', 'last_name', 'phone']
         widgets = {
             'first_name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -35,38 +64,19 @@ class RegistrationForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Иванов'
             }),
-            'email': forms.EmailInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'your@email.com'
-            }),
             'phone': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': '+7 (999) 123-45-67'
             }),
-            'username': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'username'
-            }),
         }
         labels = {
             'first_name': 'Имя',
             'last_name': 'Фамилия',
-            'email': 'Email',
             'phone': 'Телефон',
-            'username': 'Имя пользователя',
         }
 
     def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if CustomUser.objects.filter(email=email).exists():
-            raise forms.ValidationError('Пользователь с таким email уже существует')
-        return email
-
-    def clean_username(self):
-        username = self.cleaned_data.get('username')
-        if CustomUser.objects.filter(username=username).exists():
-            raise forms.ValidationError('Это имя пользователя уже занято')
-        return username
+        return CustomUser.objects.normalize_email(self.cleaned_data.get('email'))
 
     def clean(self):
         cleaned_data = super().clean()
@@ -76,8 +86,33 @@ class RegistrationForm(forms.ModelForm):
         if password and password_confirm and password != password_confirm:
             raise forms.ValidationError('Пароли не совпадают')
 
+        self.check_taken(cleaned_data.get('email'), cleaned_data.get('username'))
         return cleaned_data
 
+    def check_taken(self, email, username):
+        """Занятость email (без учета регистра) и имени пользователя — один запрос по индексам"""
+        conditions = []
+        if email:
+            conditions.append(Q(email_lower=email.lower()) & ~Q(email=''))
+        if username:
+            conditions.append(Q(username=username))
+        if not conditions:
+            return
+
+        taken = CustomUser.objects.alias(email_lower=Lower('email')).filter(
+            reduce(operator.or_, conditions)
+        ).values_list('email', 'username')[:2]
+        for taken_email, taken_username in taken:
+            if email and taken_email.lower() == email.lower():
+                self.add_error('email', 'Пользователь с таким email уже существует')
+            if username and taken_username == username:
+                self.add_error('username', 'Это имя пользователя уже занято')
+
+    def save(self, commit=True):
+        self.instance.email = self.cleaned_data['email']
+        self.instance.username = self.cleaned_data['username']
+        return super().save(commit)
+
 
 class LoginForm(forms.Form):
     """Форма входа"""
@@ -231,3 +266,30 @@ class AnimalFilterForm(forms.Form):
             'placeholder': 'Поиск по имени, породе или описанию'
         })
     )
+
+    def __init__(self, *args, facet_counts=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Добавляем к вариантам фильтров количество подходящих животных
+        if facet_counts:
+            for name, counts in facet_counts.items():
+                field = self.fields[name]
+                field.choices = [
+                    (value, f'{label} ({counts.get(value, 0)})' if value else label)
+                    for value, label in field.choices
+                ]
+
+
+class AnimalImportUploadForm(forms.Form):
+    """Загрузка файла с животными в админке"""
+    file = forms.FileField(
+        label='Файл CSV, JSON или JSON Lines',
+        help_text='Первая строка CSV — названия полей Animal; колонка photo — имя файла в архиве'
+    )
+    photos = forms.FileField(
+        required=False,
+        label='Архив ZIP с фото'
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Только проверить, ничего не записывать'
+    )
@@ -0,0 +1,381 @@
+"""
+Массовый импорт животных из файлов партнерских приютов.
+
+Строки CSV (разделитель , ; или табуляция, кодировка UTF-8), JSON-массива
+или JSON Lines читаются по одной и проверяются полями модели Animal
+(обязательность, длина, варианты выбора). Форма на каждую строку не
+создается: ее конструктор копирует все поля и стоит дороже самой записи.
+В полях с вариантами можно писать и код (dog), и название (Собака).
+Проверенные строки сохраняются пачками через services.create_animals,
+каждая пачка в своей транзакции; в памяти держится только текущая пачка.
+
+Колонка photo — имя файла в ZIP-архиве или каталоге с фото. Сначала
+пул потоков проверяет, что это изображение (Image.verify, как у
+ImageField); строка с негодным фото попадает в отчет и не сохраняется.
+После сохранения пачки файлы копируются в хранилище и получают превью
+в том же пуле, и одна пачка UPDATE записывает их в животных.
+
+Строки с ошибками пропускаются и попадают в отчет (с номером строки
+файла); при dry_run ничего не записывается.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from .models import Animal
+from .renditions import FIELD_RENDITIONS, render_renditions
+from .services import create_animals
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FIELDS = [
+    'name', 'animal_type', 'breed', 'age', 'gender', 'size', 'color',
+    'description', 'health_status', 'status', 'vaccinated', 'sterilized',
+]
+
+PHOTO_COLUMN = 'photo'
+
+# Ошибок в отчете; остальные только считаются
+MAX_REPORTED_ERRORS = 200
+
+CSV_DELIMITERS = ',;\t'
+
+# Поля с вариантами: название в любом регистре -> код
+CHOICE_LABELS = {
+    field: {str(label).lower(): value for value, label in Animal._meta.get_field(field).choices}
+    for field in ('animal_type', 'age', 'gender', 'size', 'status')
+}
+
+BOOLEAN_VALUES = {
+    'да': True, 'yes': True, 'true': True, '1': True, '+': True,
+    'нет': False, 'no': False, 'false': False, '0': False, '-': False, '': False,
+}
+
+
+class ImportFileError(Exception):
+    """Файл нельзя прочитать как список животных"""
+
+
+def read_csv(fp):
+    """(номер строки, словарь) для каждой строки CSV; разделитель определяется по заголовку"""
+    text = io.TextIOWrapper(fp, encoding='utf-8-sig', newline='')
+    try:
+        header = text.readline()
+        if not header.strip():
+            raise ImportFileError('Пустой файл')
+        delimiter = max(CSV_DELIMITERS, key=header.count)
+        reader = csv.DictReader(chain([header], text), delimiter=delimiter)
+        for row in reader:
+            yield reader.line_num, row
+    except UnicodeDecodeError as exc:
+        raise ImportFileError(f'Файл не в кодировке UTF-8: {exc}') from exc
+    except csv.Error as exc:
+        raise ImportFileError(f'Ошибка CSV: {exc}') from exc
+    finally:
+        # Файл закрывает тот, кто его открыл
+        text.detach()
+
+
+def read_json(fp, chunk_size=64 * 1024):
+    """(номер объекта, словарь) для JSON-массива объектов или JSON Lines, без чтения файла целиком"""
+    text = io.TextIOWrapper(fp, encoding='utf-8-sig')
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    number = 0
+    try:
+        while True:
+            # Между объектами — скобки массива, запятые и переводы строк
+            buffer = buffer.lstrip(' \t\r\n,[]')
+            if not buffer:
+                if eof:
+                    return
+                chunk = text.read(chunk_size)
+                eof = not chunk
+                buffer = chunk
+                continue
+            if buffer[0] != '{':
+                raise ImportFileError(f'Объект {number + 1}: ожидался объект JSON')
+            try:
+                row, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ImportFileError(f'Объект {number + 1}: {exc}') from exc
+                # Объект еще не прочитан до конца
+                chunk = text.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            number += 1
+            buffer = buffer[end:]
+            yield number, row
+    except UnicodeDecodeError as exc:
+        raise ImportFileError(f'Файл не в кодировке UTF-8: {exc}') from exc
+    finally:
+        text.detach()
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+    'jsonl': read_json,
+}
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension not in READERS:
+        raise ImportFileError(f"Неизвестный формат файла {filename}: нужен {', '.join(READERS)}")
+    return extension
+
+
+class ZipPhotos:
+    """Фото из ZIP-архива (имена — пути внутри архива)"""
+
+    def __init__(self, source):
+        self.archive = zipfile.ZipFile(source)
+        self.names = {info.filename for info in self.archive.infolist() if not info.is_dir()}
+
+    def exists(self, name):
+        return name in self.names
+
+    def read(self, name):
+        # ZipFile позволяет читать разные файлы архива из нескольких потоков
+        return self.archive.read(name)
+
+    def close(self):
+        self.archive.close()
+
+
+class DirectoryPhotos:
+    """Фото из каталога (имена — пути относительно него)"""
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+
+    def path(self, name):
+        path = os.path.realpath(os.path.join(self.root, name))
+        if os.path.commonpath([path, self.root]) != self.root:
+            return None
+        return path
+
+    def exists(self, name):
+        path = self.path(name)
+        return path is not None and os.path.isfile(path)
+
+    def read(self, name):
+        with open(self.path(name), 'rb') as fp:
+            return fp.read()
+
+    def close(self):
+        pass
+
+
+def open_photos(source):
+    """Источник фото: путь к каталогу, путь к ZIP или файловый объект ZIP"""
+    if source is None:
+        return None
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        return DirectoryPhotos(source)
+    try:
+        return ZipPhotos(source)
+    except (OSError, zipfile.BadZipFile) as exc:
+        raise ImportFileError(f'Не удалось открыть архив с фото: {exc}') from exc
+
+
+def normalize_row(row):
+    """Ключи в нижнем регистре, значения без пробелов по краям, названия вариантов — кодами"""
+    data = {}
+    for key, value in row.items():
+        if key is None:
+            # Лишние ячейки строки CSV без заголовка
+            continue
+        key = key.strip().lower()
+        if isinstance(value, str):
+            value = value.strip()
+        elif value is None:
+            value = ''
+        if key in CHOICE_LABELS and isinstance(value, str):
+            value = CHOICE_LABELS[key].get(value.lower(), value)
+        if key in ('vaccinated', 'sterilized') and isinstance(value, str):
+            value = BOOLEAN_VALUES.get(value.lower(), value)
+        data[key] = value
+    return data
+
+
+def clean_row(data):
+    """(значения полей, ошибки) строки; пустой статус — животное в приюте"""
+    values = {}
+    errors = []
+    for name in IMPORT_FIELDS:
+        field = Animal._meta.get_field(name)
+        value = data.get(name, '')
+        if value == '' and field.has_default():
+            value = field.get_default()
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as exc:
+            errors.append(f"{name}: {' '.join(exc.messages)}")
+    return values, errors
+
+
+def check_photo(photos, name):
+    """Выполняется в пуле: сообщение об ошибке, если файл не изображение, иначе None"""
+    try:
+        with Image.open(io.BytesIO(photos.read(name))) as image:
+            image.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return f'photo: файл {name} не является изображением'
+    except zipfile.BadZipFile as exc:
+        return f'photo: {exc}'
+    return None
+
+
+def store_photo(photos, name):
+    """Выполняется в пуле: скопировать фото в хранилище и создать превью; без обращений к базе"""
+    field = Animal._meta.get_field('photo')
+    stored = field.storage.save(
+        field.generate_filename(None, os.path.basename(name)), ContentFile(photos.read(name))
+    )
+    try:
+        renditions = render_renditions(field.storage, stored, FIELD_RENDITIONS['photo'])
+    except (OSError, Image.DecompressionBombError):
+        logger.exception('Не удалось создать превью для %s', stored)
+        renditions = {}
+    return stored, renditions
+
+
+class ImportResult:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.photos = 0
+        self.failed = 0
+        # [(номер строки, сообщение)], не больше MAX_REPORTED_ERRORS
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def valid(self):
+        return self.rows - self.failed
+
+
+class AnimalImporter:
+    def __init__(self, photos=None, batch_size=500, workers=4, dry_run=False):
+        self.photos = photos
+        self.batch_size = batch_size
+        self.workers = workers
+        self.result = ImportResult(dry_run)
+        self.executor = None
+
+    def run(self, rows):
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self.executor = executor
+            for line, row in rows:
+                self.result.rows += 1
+                entry = self.validate(line, row)
+                if entry is None:
+                    continue
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    self.save(batch)
+                    batch = []
+            if batch:
+                self.save(batch)
+        return self.result
+
+    def validate(self, line, row):
+        """(номер строки, несохраненное животное, имя фото) или None с ошибкой в отчете"""
+        if not isinstance(row, dict):
+            self.result.add_error(line, 'ожидался объект с полями животного')
+            return None
+        data = normalize_row(row)
+        values, errors = clean_row(data)
+        if errors:
+            self.result.add_error(line, '; '.join(errors))
+            return None
+
+        photo = data.get(PHOTO_COLUMN) or ''
+        if photo:
+            if self.photos is None:
+                self.result.add_error(line, f'photo: не указан архив или каталог с фото для {photo}')
+                return None
+            if not self.photos.exists(photo):
+                self.result.add_error(line, f'photo: файл {photo} не найден')
+                return None
+        return line, Animal(**values), photo
+
+    def save(self, batch):
+        """Проверить фото пачки, сохранить животных (кроме dry_run) и прикрепить фото"""
+        batch = self.check_photos(batch)
+        if self.result.dry_run or not batch:
+            return
+        animals = create_animals([animal for _, animal, _ in batch])
+        self.result.created += len(animals)
+
+        with_photos = [(line, animal, photo) for (line, _, photo), animal in zip(batch, animals) if photo]
+        futures = [
+            (line, animal, self.executor.submit(store_photo, self.photos, photo))
+            for line, animal, photo in with_photos
+        ]
+        updated = []
+        for line, animal, future in futures:
+            try:
+                animal.photo, animal.photo_renditions = future.result()
+            except (OSError, zipfile.BadZipFile) as exc:
+                # Животное уже сохранено; фото можно добавить вручную
+                self.result.add_error(line, f'photo: {exc}; животное добавлено без фото')
+                continue
+            updated.append(animal)
+        if updated:
+            with transaction.atomic():
+                Animal.objects.bulk_update(updated, ['photo', 'photo_renditions'])
+            self.result.photos += len(updated)
+
+    def check_photos(self, batch):
+        """Строки пачки с годными фото или без фото; остальные — в отчет"""
+        checks = {
+            line: self.executor.submit(check_photo, self.photos, photo)
+            for line, _, photo in batch if photo
+        }
+        valid = []
+        for entry in batch:
+            error = checks[entry[0]].result() if entry[0] in checks else None
+            if error is None:
+                valid.append(entry)
+            else:
+                self.result.add_error(entry[0], error)
+        return valid
+
+
+def import_animals(fp, file_format, photos=None, batch_size=500, workers=4, dry_run=False):
+    """
+    Импортировать животных из бинарного файла fp формата csv, json или jsonl.
+
+    photos: каталог, путь к ZIP или файловый объект ZIP. Возвращает ImportResult;
+    ImportFileError — если файл или архив не читается.
+    """
+    source = open_photos(photos)
+    try:
+        importer = AnimalImporter(source, batch_size, workers, dry_run)
+        return importer.run(READERS[file_format](fp))
+    finally:
+        if source is not None:
+            source.close()
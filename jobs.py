@@ -0,0 +1,192 @@
+"""
+Очередь фоновых задач в базе данных (таблица Job).
+
+Функции-задачи регистрируются декоратором @task и ставятся в очередь
+через enqueue() — в той же транзакции, что и данные, которые их породили.
+Воркер (manage.py run_jobs) забирает задачи запросом
+SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько процессов не получат
+одну задачу. Упавшая задача повторяется с экспоненциальной задержкой.
+Выполненные задачи удаляются через SHELTER_JOB_KEEP_DONE секунд (неделя).
+SKIP LOCKED есть только в PostgreSQL; с SQLite запускайте один воркер.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Имя задачи: функция
+TASKS = {}
+
+
+def task(func):
+    """Зарегистрировать функцию как фоновую задачу (параметры — только JSON)"""
+    TASKS[func.__name__] = func
+    return func
+
+
+def enqueue(func, delay=None, max_attempts=None, **payload):
+    """Поставить зарегистрированную задачу в очередь"""
+    if TASKS.get(func.__name__) is not func:
+        raise ValueError(f'{func.__name__} не зарегистрирована как задача')
+    job = Job(task=func.__name__, payload=payload)
+    if delay:
+        job.run_at = timezone.now() + delay
+    if max_attempts:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def absorb_pending_jobs(func):
+    """
+    Забрать еще не начатые задачи func (включая отложенные) и отметить их
+    выполненными; возвращает их параметры. Для задач, которые складываются
+    в одну (пересчет по списку id). Вызывать внутри транзакции, в которой
+    делается работа: при ошибке задачи вернутся в очередь.
+    """
+    jobs = list(
+        Job.objects.filter(task=func.__name__, status='pending')
+        .select_for_update(skip_locked=True)
+        .values_list('pk', 'payload')
+    )
+    if jobs:
+        Job.objects.filter(pk__in=[pk for pk, _ in jobs]).update(
+            status='done',
+            updated_at=timezone.now()
+        )
+    return [payload for _, payload in jobs]
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой: 30 с, 1 мин, 2 мин... но не больше часа"""
+    base = getattr(settings, 'SHELTER_JOB_RETRY_DELAY', 30)
+    limit = getattr(settings, 'SHELTER_JOB_MAX_RETRY_DELAY', 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), limit))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_jobs(limit, worker=None):
+    """Забрать до limit готовых к выполнению задач и отметить их как выполняемые"""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.filter(status='pending', run_at__lte=now)
+            .order_by('run_at', 'pk')
+            .select_for_update(skip_locked=True)[:limit]
+        )
+        if not jobs:
+            return []
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status='running',
+            attempts=F('attempts') + 1,
+            locked_at=now,
+            locked_by=worker or worker_name(),
+            updated_at=now
+        )
+    for job in jobs:
+        job.status = 'running'
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job):
+    """Выполнить задачу; при ошибке запланировать повтор или пометить как failed"""
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.task}')
+        func(**job.payload)
+    except Exception:
+        logger.exception('Ошибка в задаче %s #%s (попытка %s)', job.task, job.pk, job.attempts)
+        now = timezone.now()
+        updates = {
+            'last_error': traceback.format_exc(),
+            'locked_at': None,
+            'locked_by': '',
+            'updated_at': now,
+        }
+        if func is None or job.attempts >= job.max_attempts:
+            updates['status'] = 'failed'
+        else:
+            updates['status'] = 'pending'
+            updates['run_at'] = now + retry_delay(job.attempts)
+        Job.objects.filter(pk=job.pk).update(**updates)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status='done',
+        locked_at=None,
+        locked_by='',
+        updated_at=timezone.now()
+    )
+    return True
+
+
+def run_pending_jobs(limit=10, worker=None):
+    """Забрать и выполнить одну пачку задач; возвращает (выполнено, с ошибкой)"""
+    done = failed = 0
+    for job in claim_jobs(limit, worker):
+        if run_job(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def requeue_stale_jobs(timeout):
+    """
+    Вернуть в очередь задачи, которые воркер взял и не завершил за timeout.
+
+    Задачи, у которых попытки исчерпаны, помечаются как failed: иначе задача,
+    роняющая воркер, выполнялась бы бесконечно. Возвращает число возвращенных.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timeout)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed',
+        last_error=f'Воркер не завершил задачу за {timeout}',
+        locked_at=None,
+        locked_by='',
+        updated_at=now
+    )
+    return stale.update(
+        status='pending',
+        run_at=now,
+        locked_at=None,
+        locked_by='',
+        updated_at=now
+    )
+
+
+def prune_done_jobs(older_than=None, batch_size=1000):
+    """
+    Удалить выполненные задачи старше older_than (по умолчанию
+    SHELTER_JOB_KEEP_DONE секунд). Удаляет пачками по batch_size, чтобы не
+    держать долгих блокировок; возвращает число удаленных.
+    """
+    if older_than is None:
+        older_than = timedelta(seconds=getattr(settings, 'SHELTER_JOB_KEEP_DONE', 7 * 24 * 3600))
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    while True:
+        pks = list(
+            Job.objects.filter(status='done', updated_at__lt=cutoff)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return deleted
+        deleted += Job.objects.filter(pk__in=pks).delete()[0]
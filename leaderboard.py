@@ -0,0 +1,78 @@
+"""
+Рейтинг доноров (таблица DonorTotal).
+
+Учитываются оплаченные неанонимные пожертвования зарегистрированных
+пользователей. Каждое изменение применяется к строке пользователя
+атомарным UPDATE ... SET total = total + n.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Donation, DonorTotal
+
+
+def leaderboard_entry(user_id, amount, is_anonymous, payment_status):
+    """(user_id, amount), если пожертвование учитывается в рейтинге, иначе None"""
+    if user_id is None or is_anonymous or payment_status != 'completed':
+        return None
+    return user_id, Decimal(str(amount))
+
+
+def record_donation_changes(changes):
+    """
+    Применить изменения к рейтингу.
+
+    changes: итерируемое из (old_entry, new_entry), где entry —
+    результат leaderboard_entry (None — пожертвование не учитывается).
+    """
+    deltas = defaultdict(lambda: [Decimal(0), 0])
+    for old_entry, new_entry in changes:
+        if old_entry == new_entry:
+            continue
+        if old_entry is not None:
+            user_id, amount = old_entry
+            deltas[user_id][0] -= amount
+            deltas[user_id][1] -= 1
+        if new_entry is not None:
+            user_id, amount = new_entry
+            deltas[user_id][0] += amount
+            deltas[user_id][1] += 1
+
+    with transaction.atomic():
+        # Фиксированный порядок строк исключает взаимные блокировки
+        for user_id in sorted(deltas):
+            amount, count = deltas[user_id]
+            if not amount and not count:
+                continue
+            updates = {'total': F('total') + amount, 'donations': F('donations') + count}
+            if not DonorTotal.objects.filter(pk=user_id).update(**updates):
+                DonorTotal.objects.bulk_create(
+                    [DonorTotal(pk=user_id)], ignore_conflicts=True
+                )
+                DonorTotal.objects.filter(pk=user_id).update(**updates)
+
+
+def get_top_donors(limit=10):
+    """Первые limit доноров по сумме пожертвований"""
+    return DonorTotal.objects.filter(donations__gt=0).order_by('-total', 'user_id').values(
+        'user__first_name', 'user__last_name', 'total', 'donations'
+    )[:limit]
+
+
+def rebuild_donor_totals():
+    """Пересчитать рейтинг с нуля по таблице пожертвований"""
+    with transaction.atomic():
+        grouped = Donation.objects.filter(
+            payment_status='completed',
+            is_anonymous=False,
+            user__isnull=False
+        ).values('user').annotate(total=Sum('amount'), donations=Count('pk')).order_by('user_id')
+
+        DonorTotal.objects.all().delete()
+        return DonorTotal.objects.bulk_create([
+            DonorTotal(pk=row['user'], total=row['total'], donations=row['donations'])
+            for row in grouped
+        ], batch_size=1000)
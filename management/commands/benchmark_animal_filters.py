@@ -0,0 +1,135 @@
+import itertools
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from ...models import Animal
+
+
+# Значения фильтров, которые подставляются в сценарии animals_list
+FILTER_VALUES = {
+    'animal_type': 'cat',
+    'age': 'young',
+    'gender': 'female',
+    'size': 'small',
+}
+
+STATUS_WEIGHTS = [('available', 60), ('reserved', 10), ('adopted', 30)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет каталог тестовыми животными, снимает EXPLAIN и время '
+        'выполнения для каждой комбинации фильтров публичных страниц. '
+        'По умолчанию все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animals', type=int, default=100_000, help='Сколько животных создать')
+        parser.add_argument('--repeat', type=int, default=20, help='Сколько раз выполнять каждый запрос')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора данных')
+        parser.add_argument('--output', help='Путь к JSON-файлу с планами и замерами')
+        parser.add_argument('--keep', action='store_true', help='Не откатывать созданные данные')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['animals'], options['seed'])
+            self.analyze()
+
+            results = [
+                self.measure(label, queryset, options['repeat'])
+                for label, queryset in self.scenarios()
+            ]
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        for result in results:
+            self.stdout.write(
+                f"{result['scenario']:<55} {result['median_ms']:>8.2f} ms  "
+                f"{', '.join(result['indexes_used']) or 'без индексов'}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                json.dump({
+                    'vendor': connection.vendor,
+                    'animals': options['animals'],
+                    'repeat': options['repeat'],
+                    'results': results,
+                }, fp, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+    def seed(self, count, seed, batch_size=5000):
+        """Детерминированно создать count животных"""
+        rng = random.Random(seed)
+        statuses, weights = zip(*STATUS_WEIGHTS)
+
+        def make(i):
+            return Animal(
+                name=f'Животное {i}',
+                animal_type=rng.choice(Animal.ANIMAL_TYPES)[0],
+                age=rng.choice(Animal.AGE_CHOICES)[0],
+                gender=rng.choice(Animal.GENDER_CHOICES)[0],
+                size=rng.choice(Animal.SIZE_CHOICES)[0],
+                description='Тестовое животное для замеров',
+                status=rng.choices(statuses, weights)[0],
+            )
+
+        for start in range(0, count, batch_size):
+            Animal.objects.bulk_create(
+                [make(i) for i in range(start, min(start + batch_size, count))],
+                batch_size=batch_size
+            )
+
+    def analyze(self):
+        """Обновить статистику планировщика после массовой вставки"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Animal._meta.db_table}')
+
+    def scenarios(self):
+        """Запросы публичных представлений: (название, queryset)"""
+        available = Animal.objects.filter(status='available')
+
+        yield 'home', available.order_by('-created_at')[:6]
+
+        for size in range(len(FILTER_VALUES) + 1):
+            for fields in itertools.combinations(FILTER_VALUES, size):
+                filters = {field: FILTER_VALUES[field] for field in fields}
+                label = 'animals_list ' + (', '.join(fields) or 'без фильтров')
+                yield label, available.filter(**filters)[:12]
+
+        sample = available.filter(animal_type='dog').first()
+        if sample is not None:
+            yield 'animal_detail similar', available.filter(
+                animal_type=sample.animal_type
+            ).exclude(pk=sample.pk)[:4]
+
+        yield 'about', Animal.objects.filter(status='adopted').values(
+            'animal_type'
+        ).annotate(total=Count('pk')).order_by()
+
+    def measure(self, label, queryset, repeat):
+        plan = queryset.explain()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return {
+            'scenario': label,
+            'sql': str(queryset.query),
+            'plan': plan,
+            'indexes_used': [
+                index.name for index in Animal._meta.indexes if index.name in plan
+            ],
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'max_ms': max(timings),
+        }
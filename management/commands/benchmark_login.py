@@ -0,0 +1,125 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ...auth_backends import users_with_email
+from ...forms import RegistrationForm
+from ...models import CustomUser
+
+
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает вход по email до и после перехода на EmailBackend: число '
+        'запросов, время поиска пользователя и план запроса. Тестовые '
+        'пользователи создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000, help='Сколько пользователей создать')
+        parser.add_argument('--repeat', type=int, default=50, help='Сколько раз выполнять каждый поиск')
+        parser.add_argument('--output', help='Путь к JSON-файлу с планами и замерами')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            email = self.seed(options['users'])
+            self.analyze()
+            results = {
+                'lookup': [
+                    self.measure('email = %s (было)', CustomUser.objects.filter(email=email), options['repeat']),
+                    self.measure('lower(email) = %s (стало)', users_with_email(email.upper()), options['repeat']),
+                ],
+                'queries': self.count_queries(email),
+            }
+            transaction.set_rollback(True)
+
+        for result in results['lookup']:
+            self.stdout.write(
+                f"{result['scenario']:<36} {result['median_ms']:>8.3f} ms  "
+                f"{', '.join(result['indexes_used']) or 'без индексов'}"
+            )
+        for label, count in results['queries'].items():
+            self.stdout.write(f'{label:<36} {count} запр.')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                json.dump({
+                    'vendor': connection.vendor,
+                    'users': options['users'],
+                    'repeat': options['repeat'],
+                    **results,
+                }, fp, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+    def seed(self, count, batch_size=5000):
+        """Создать count пользователей с одним заранее посчитанным хешем; вернуть email из середины"""
+        password = make_password(PASSWORD)
+        for start in range(0, count, batch_size):
+            CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=f'bench{i}', email=f'Bench.User{i}@example.com',
+                    first_name='Тест', password=password,
+                )
+                for i in range(start, min(start + batch_size, count))
+            ], batch_size=batch_size)
+        return f'Bench.User{count // 2}@example.com'
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {CustomUser._meta.db_table}')
+
+    def measure(self, label, queryset, repeat):
+        plan = queryset.explain()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return {
+            'scenario': label,
+            'sql': str(queryset.query),
+            'plan': plan,
+            'indexes_used': [
+                name for name in self.index_names() if name in plan
+            ],
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'max_ms': max(timings),
+        }
+
+    def index_names(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, CustomUser._meta.db_table)
+        return [name for name, info in constraints.items() if info['index'] or info['unique']]
+
+    def count_queries(self, email):
+        """Запросы на вход и на проверку формы регистрации"""
+        counts = {}
+
+        with CaptureQueriesContext(connection) as queries:
+            user = CustomUser.objects.get(email=email)
+            ModelBackend().authenticate(None, username=user.username, password=PASSWORD)
+        counts['вход: get + authenticate (было)'] = len(queries)
+
+        with CaptureQueriesContext(connection) as queries:
+            user = authenticate(None, email=email.upper(), password=PASSWORD)
+        counts['вход: EmailBackend (стало)'] = len(queries) if user is not None else None
+
+        form = RegistrationForm({
+            'first_name': 'Тест', 'last_name': 'Тестов', 'email': email.lower(),
+            'phone': '', 'username': 'new-user', 'password': PASSWORD, 'password_confirm': PASSWORD,
+        })
+        with CaptureQueriesContext(connection) as queries:
+            valid = form.is_valid()
+        counts['форма регистрации (занятый email)'] = len(queries) if not valid else None
+        return counts
@@ -0,0 +1,175 @@
+import json
+import multiprocessing
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import resolve, reverse
+
+from ...metrics import MetricsMiddleware, QueryTimer, collect, record_request, registry
+
+
+METRICS_MIDDLEWARE = f'{MetricsMiddleware.__module__}.{MetricsMiddleware.__qualname__}'
+
+
+def record_in_process(directory, requests):
+    """Дочерний процесс: записать requests запросов и сбросить файл"""
+    with override_settings(SHELTER_METRICS_DIR=directory):
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve(reverse('home'))
+        response = HttpResponse(b'x' * 100)
+        for _ in range(requests):
+            record_request(request, response, 0.01, 3, 0.001)
+        registry.flush(directory)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет накладные расходы MetricsMiddleware: на запрос без SQL, на '
+        'SQL-запрос, на запрос через тестовый клиент, на запись файла процесса; '
+        'проверяет суммирование метрик нескольких процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100_000, help='Вызовов middleware в микротесте')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов через тестовый клиент')
+        parser.add_argument('--processes', type=int, default=4, help='Процессов в проверке суммирования')
+        parser.add_argument('--output', help='Путь к JSON-файлу с результатами')
+
+    def handle(self, *args, **options):
+        # До замеров: дочерние процессы наследуют значения этого процесса
+        merged = self.check_processes(options['processes'], 1000)
+        results = {
+            'vendor': connection.vendor,
+            'request_overhead_us': self.measure_request_overhead(options['iterations']),
+            'query_overhead_us': self.measure_query_overhead(options['iterations'] // 10),
+            'client': self.measure_client(options['requests']),
+            'flush_ms': self.measure_flush(),
+        }
+
+        self.stdout.write(f"Запрос без SQL:              {results['request_overhead_us']:+.2f} мкс")
+        self.stdout.write(f"SQL-запрос:                  {results['query_overhead_us']:+.2f} мкс")
+        client = results['client']
+        self.stdout.write(
+            f"Тестовый клиент ({client['url']}): {client['without_ms']:.3f} -> "
+            f"{client['with_ms']:.3f} мс ({client['overhead_percent']:+.1f}%)"
+        )
+        self.stdout.write(f"Запись файла процесса:       {results['flush_ms']:.2f} мс")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                json.dump(results, fp, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+        expected = options['processes'] * 1000
+        if merged != expected:
+            raise CommandError(f'Из файлов процессов собрано {merged} запросов вместо {expected}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Метрики {options['processes']} процессов сложены без потерь: {merged} запросов"
+        ))
+
+    def compare_us(self, base, candidate, iterations, rounds=7):
+        """
+        Разница времени одного вызова candidate и base, мкс.
+
+        Прогоны чередуются, берется лучший прогон каждого варианта: так
+        меньше влияют прогрев и фоновая нагрузка.
+        """
+        timings = {base: [], candidate: []}
+        for _ in range(rounds):
+            for func in (base, candidate):
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    func()
+                timings[func].append((time.perf_counter() - started) / iterations * 1_000_000)
+        return min(timings[candidate]) - min(timings[base])
+
+    def measure_request_overhead(self, iterations):
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve(reverse('home'))
+        response = HttpResponse(b'x' * 5000)
+
+        def view(request):
+            return response
+
+        middleware = MetricsMiddleware(view)
+        return self.compare_us(lambda: view(request), lambda: middleware(request), iterations)
+
+    def measure_query_overhead(self, iterations):
+        def run_query():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        def noop(execute, sql, params, many, context):
+            return execute(sql, params, many, context)
+
+        # Установка обертки делается раз на HTTP-запрос и учтена выше; здесь — цена самого счетчика
+        def with_wrapper(wrapper):
+            def run():
+                with connection.execute_wrapper(wrapper):
+                    run_query()
+            return run
+
+        return self.compare_us(with_wrapper(noop), with_wrapper(QueryTimer()), iterations)
+
+    def measure_client(self, requests):
+        url = reverse('api_check_availability_batch') + '?ids=1,2,3'
+        without = [name for name in settings.MIDDLEWARE if name != METRICS_MIDDLEWARE]
+        setup_test_environment()
+        try:
+            timings = {}
+            # Чередуем прогоны, чтобы прогрев и шум распределились поровну
+            for _ in range(5):
+                for label, middleware in (('without', without), ('with', [METRICS_MIDDLEWARE] + without)):
+                    with override_settings(MIDDLEWARE=middleware):
+                        client = Client()
+                        client.get(url)
+                        started = time.perf_counter()
+                        for _ in range(requests):
+                            client.get(url)
+                        timings.setdefault(label, []).append(
+                            (time.perf_counter() - started) / requests * 1000
+                        )
+        finally:
+            teardown_test_environment()
+
+        without_ms = min(timings['without'])
+        with_ms = min(timings['with'])
+        return {
+            'url': url,
+            'without_ms': without_ms,
+            'with_ms': with_ms,
+            'overhead_percent': (with_ms - without_ms) / without_ms * 100,
+        }
+
+    def measure_flush(self):
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            for _ in range(20):
+                registry.flush(directory)
+            return (time.perf_counter() - started) / 20 * 1000
+
+    def check_processes(self, processes, requests):
+        """Запустить processes процессов и сложить их файлы; вернуть число запросов home"""
+        with tempfile.TemporaryDirectory() as directory:
+            connection.close()
+            context = multiprocessing.get_context('fork')
+            workers = [
+                context.Process(target=record_in_process, args=(directory, requests))
+                for _ in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            if any(worker.exitcode for worker in workers):
+                raise CommandError('Процесс записи метрик завершился с ошибкой')
+
+            with override_settings(SHELTER_METRICS_DIR=directory):
+                histograms, _ = collect()
+            return sum(histograms.get(('shelter_http_request_duration_seconds', ('home', 'GET')), [0])[:-1])
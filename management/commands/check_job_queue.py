@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from ...jobs import enqueue, prune_done_jobs, requeue_stale_jobs, run_pending_jobs
+from ...models import Animal, Job
+from ...tasks import (
+    send_reservation_confirmation, notify_staff_about_reservation,
+    notify_staff_about_support_request, send_donation_confirmation
+)
+
+
+MAIL_TASKS = [
+    send_reservation_confirmation, notify_staff_about_reservation,
+    notify_staff_about_support_request, send_donation_confirmation
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет очередь фоновых задач с почтовым бэкендом locmem: представления '
+        'только ставят письма в очередь, воркер их отправляет, ошибки повторяются. '
+        'Все изменения откатываются.'
+    )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        self.failures = []
+        try:
+            with transaction.atomic(), override_settings(MANAGERS=[('Приют', 'staff@example.com')]):
+                self.check_views()
+                self.check_retries()
+                self.check_stale_and_prune()
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+        if self.failures:
+            raise CommandError('; '.join(self.failures))
+        self.stdout.write(self.style.SUCCESS('Очередь задач работает'))
+
+    def expect(self, condition, message):
+        self.stdout.write(('OK    ' if condition else 'FAIL  ') + message)
+        if not condition:
+            self.failures.append(message)
+
+    def check_views(self):
+        animal = Animal.objects.create(
+            name='Проверка очереди', animal_type='other', age='adult',
+            gender='male', size='medium', description='Создано командой check_job_queue'
+        )
+        client = Client()
+        mail.outbox = []
+        client.post(reverse('create_reservation'), {
+            'animal_id': animal.pk, 'name': 'Иван', 'phone': '+70000000000',
+            'email': 'visitor@example.com', 'visit_date': timezone.localdate().isoformat(),
+        })
+        client.post(reverse('support_request'), {
+            'name': 'Иван', 'email': 'visitor@example.com', 'subject': 'other', 'message': 'Вопрос',
+        })
+        client.post(reverse('donations'), {
+            'name': 'Иван', 'email': 'donor@example.com', 'amount': '500',
+        })
+
+        self.expect(not mail.outbox, 'представления не отправляют письма сами')
+        self.expect(
+            Job.objects.filter(status='pending', task__in=[func.__name__ for func in MAIL_TASKS]).count() == 4,
+            'в очереди 4 письма (2 по брони, обращение, пожертвование)'
+        )
+
+        done, failed = run_pending_jobs(limit=100)
+        self.expect(
+            failed == 0 and not Job.objects.filter(
+                status='pending', task__in=[func.__name__ for func in MAIL_TASKS]
+            ).exists(),
+            f'воркер выполнил задачи: {done} успешно, {failed} с ошибкой'
+        )
+        recipients = sorted(address for message in mail.outbox for address in message.to)
+        self.expect(
+            recipients == ['donor@example.com', 'staff@example.com', 'staff@example.com', 'visitor@example.com'],
+            f'письма отправлены: {", ".join(recipients)}'
+        )
+        self.reservation_id = animal.reservations.get().pk
+
+    def check_retries(self):
+        mail.outbox = []
+        job = enqueue(send_reservation_confirmation, max_attempts=2, reservation_id=self.reservation_id)
+
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.missing.EmailBackend'):
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.expect(
+            job.status == 'pending' and job.attempts == 1 and job.run_at > timezone.now(),
+            'после ошибки задача отложена для повтора'
+        )
+
+        self.expect(run_pending_jobs() == (0, 0), 'отложенная задача не выполняется раньше срока')
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.expect(job.status == 'done' and len(mail.outbox) == 1, 'повтор выполнен успешно')
+
+        job = enqueue(send_reservation_confirmation, max_attempts=1, reservation_id=self.reservation_id)
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.missing.EmailBackend'):
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.expect(job.status == 'failed' and job.last_error, 'после последней попытки задача помечена как failed')
+
+    def check_stale_and_prune(self):
+        hour_ago = timezone.now() - timedelta(hours=1)
+        retry = enqueue(send_reservation_confirmation, max_attempts=2, reservation_id=self.reservation_id)
+        last = enqueue(send_reservation_confirmation, max_attempts=1, reservation_id=self.reservation_id)
+        Job.objects.filter(pk__in=[retry.pk, last.pk]).update(
+            status='running', attempts=1, locked_at=hour_ago, locked_by='check_job_queue'
+        )
+        requeue_stale_jobs(timedelta(minutes=10))
+        retry.refresh_from_db()
+        last.refresh_from_db()
+        self.expect(retry.status == 'pending', 'задача зависшего воркера возвращена в очередь')
+        self.expect(
+            last.status == 'failed' and last.last_error,
+            'задача зависшего воркера без оставшихся попыток помечена как failed'
+        )
+
+        Job.objects.filter(status='done').update(updated_at=hour_ago)
+        prune_done_jobs(timedelta(minutes=10))
+        self.expect(
+            not Job.objects.filter(status='done').exists() and Job.objects.filter(pk=last.pk).exists(),
+            'старые выполненные задачи удалены, failed оставлены'
+        )
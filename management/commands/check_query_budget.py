@@ -0,0 +1,152 @@
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from ...nplusone import detect_n_plus_one
+from ...models import (
+    CustomUser, Animal, Reservation,
+    SupportRequest, Adoption, Donation
+)
+
+
+ADMIN_MODELS = [CustomUser, Animal, Reservation, SupportRequest, Adoption, Donation]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, что число SQL-запросов на страницах не зависит от количества '
+        'строк и не превышает бюджет. Тестовые данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=120, help='Сколько записей каждого типа создать')
+        parser.add_argument('--budget', type=int, default=8, help='Максимум запросов на страницу')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        # URL -> отчет о N+1 (последний прогон — с наибольшей страницей)
+        self.n_plus_one = {}
+        try:
+            with transaction.atomic():
+                results = self.run_checks(options['rows'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+        failed = []
+        for label, counts in results:
+            over_budget = max(counts.values()) > options['budget']
+            grows = len(set(counts.values())) > 1
+            line = f"{label:<45} " + ', '.join(f'{size} строк: {n}' for size, n in counts.items())
+            if over_budget or grows:
+                failed.append(label)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        for report in self.n_plus_one.values():
+            self.stdout.write(self.style.ERROR(report))
+        if self.n_plus_one:
+            failed.append('N+1')
+
+        if failed:
+            raise CommandError(
+                f"Превышен бюджет в {options['budget']} запросов или число запросов "
+                f"растет с размером страницы: {', '.join(failed)}"
+            )
+        self.stdout.write(self.style.SUCCESS('Бюджет запросов соблюден'))
+
+    def seed(self, rows):
+        """Создать связанные записи для всех страниц"""
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'budget{i}', email=f'budget{i}@example.com',
+                       first_name='Иван', last_name=f'Петров {i}')
+            for i in range(rows)
+        ])
+        animals = Animal.objects.bulk_create([
+            Animal(name=f'Животное {i}', animal_type=Animal.ANIMAL_TYPES[i % 3][0],
+                   age='adult', gender='male', size='medium', description='Проверка бюджета')
+            for i in range(rows)
+        ])
+        today = timezone.localdate()
+        Reservation.objects.bulk_create([
+            Reservation(animal=animal, user=user, name=user.first_name, phone='+70000000000',
+                        email=user.email, visit_date=today)
+            for animal, user in zip(animals, users)
+        ])
+        Adoption.objects.bulk_create([
+            Adoption(animal=animal, user=user) for animal, user in zip(animals, users)
+        ])
+        Donation.objects.bulk_create([
+            Donation(user=user if i % 2 else None, name=f'Донор {i}', amount=100)
+            for i, user in enumerate(users)
+        ])
+        SupportRequest.objects.bulk_create([
+            SupportRequest(user=user, name=user.first_name, email=user.email,
+                           subject='other', message='Проверка бюджета')
+            for user in users
+        ])
+        return users
+
+    def run_checks(self, rows):
+        users = self.seed(rows)
+        staff = CustomUser.objects.create_superuser('budget_admin', 'budget_admin@example.com', None)
+        client = Client()
+        client.force_login(staff)
+
+        results = []
+        for model in ADMIN_MODELS:
+            url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+            results.append((f'admin {model._meta.model_name}', self.measure_changelist(client, model, url)))
+
+        # Вся история достается одному пользователю
+        owner = users[0]
+        for model in (Reservation, Adoption, Donation):
+            model.objects.filter(user__isnull=False).update(user=owner)
+        client.force_login(owner)
+        results.append(('profile', self.measure_profile(client, reverse('profile'))))
+        for section in ('reservations', 'adoptions', 'donations'):
+            url = reverse('api_profile_history', args=[section])
+            results.append((f'api profile history {section}', self.measure_profile(client, url)))
+        return results
+
+    def measure_changelist(self, client, model, url):
+        model_admin = admin.site._registry[model]
+        list_per_page = model_admin.list_per_page
+        counts = {}
+        try:
+            for size in (10, 100):
+                model_admin.list_per_page = size
+                counts[size] = self.count_queries(client, url)
+        finally:
+            model_admin.list_per_page = list_per_page
+        return counts
+
+    def measure_profile(self, client, url):
+        counts = {}
+        for size in (10, 100):
+            with override_settings(SHELTER_PROFILE_HISTORY_LIMIT=size):
+                counts[size] = self.count_queries(client, url)
+        return counts
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context, detect_n_plus_one() as detector:
+            response = client.get(url)
+        report = detector.report(url)
+        if report:
+            self.n_plus_one[url] = report
+        if response.status_code != 200:
+            raise CommandError(f'{url}: HTTP {response.status_code}')
+        return len(context.captured_queries)
@@ -0,0 +1,50 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...imports import ImportFileError, READERS, detect_format, import_animals
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует животных из CSV, JSON или JSON Lines построчно, пачками '
+        'bulk_create. Фото берутся из ZIP-архива или каталога по колонке photo. '
+        'С --dry-run только проверяет файл.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с животными')
+        parser.add_argument('--format', choices=sorted(READERS), help='Формат файла (по умолчанию по расширению)')
+        parser.add_argument('--photos', help='ZIP-архив или каталог с фото')
+        parser.add_argument('--batch-size', type=int, default=500, help='Животных в одной транзакции')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Потоков для обработки фото')
+        parser.add_argument('--dry-run', action='store_true', help='Проверить файл, ничего не записывая')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+            with open(options['path'], 'rb') as fp:
+                result = import_animals(
+                    fp, file_format, photos=options['photos'], batch_size=options['batch_size'],
+                    workers=options['workers'], dry_run=options['dry_run'],
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for line, message in result.errors:
+            self.stderr.write(f'строка {line}: {message}')
+        if result.failed > len(result.errors):
+            self.stderr.write(f'... и еще {result.failed - len(result.errors)} ошибок')
+
+        elapsed = time.perf_counter() - started
+        if result.dry_run:
+            summary = f'Проверено строк: {result.rows}, без ошибок: {result.valid}, с ошибками: {result.failed}'
+        else:
+            summary = (
+                f'Добавлено животных: {result.created}, с фото: {result.photos}, '
+                f'ошибок: {result.failed} (строк {result.rows})'
+            )
+        style = self.style.WARNING if result.failed else self.style.SUCCESS
+        self.stdout.write(style(f'{summary} за {elapsed:.1f} с'))
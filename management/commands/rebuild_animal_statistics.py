@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ...stats import rebuild_animal_statistics
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики статистики животных с нуля'
+
+    def handle(self, *args, **options):
+        for statistics in rebuild_animal_statistics():
+            self.stdout.write(
+                f'{statistics.animal_type}: всего {statistics.total}, '
+                f'в приюте {statistics.available}, '
+                f'забронировано {statistics.reserved}, '
+                f'усыновлено {statistics.adopted}'
+            )
+        self.stdout.write(self.style.SUCCESS('Статистика пересчитана'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ...leaderboard import rebuild_donor_totals
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг доноров с нуля по оплаченным пожертвованиям'
+
+    def handle(self, *args, **options):
+        totals = rebuild_donor_totals()
+        self.stdout.write(self.style.SUCCESS(f'Рейтинг пересчитан: доноров {len(totals)}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ...admin_search import SEARCH_DOCUMENT_FIELDS, refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает тексты для поиска в админке. Нужен после bulk_create, '
+        'queryset.update() и других изменений в обход сигналов.'
+    )
+
+    def handle(self, *args, **options):
+        for model in SEARCH_DOCUMENT_FIELDS:
+            updated = refresh_search_documents(model._default_manager.all())
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {updated}')
+        self.stdout.write(self.style.SUCCESS('Тексты для поиска пересчитаны'))
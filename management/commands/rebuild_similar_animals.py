@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...recommendations import rebuild_similar_animals
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки похожих животных для всех животных с нуля'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_similar_animals()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны: записей {count} за {time.perf_counter() - started:.1f} с'
+        ))
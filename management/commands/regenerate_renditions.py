@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+from PIL import Image
+
+from ...models import Animal, CustomUser
+from ...renditions import FIELD_RENDITIONS, delete_renditions, render_renditions, renditions_field
+
+
+MODELS = {
+    'animal': (Animal, 'photo'),
+    'user': (CustomUser, 'avatar'),
+}
+
+
+def render_file(task):
+    """Выполняется в процессе пула: создает превью одного файла, не обращаясь к базе"""
+    model_label, field_name, pk, name = task
+    storage = apps.get_model(model_label)._meta.get_field(field_name).storage
+    try:
+        return pk, render_renditions(storage, name, FIELD_RENDITIONS[field_name]), None
+    except (OSError, Image.DecompressionBombError) as exc:
+        return pk, None, f'{name}: {exc}'
+
+
+class Command(BaseCommand):
+    help = 'Пересоздает превью фото животных и аватаров пользователей в пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', choices=sorted(MODELS), action='append',
+            help='Обработать только указанную модель (можно повторять)'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Количество процессов'
+        )
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Только изображения, для которых превью еще не создавались'
+        )
+
+    def handle(self, *args, **options):
+        for key in options['model'] or sorted(MODELS):
+            model, field_name = MODELS[key]
+            self.regenerate(model, field_name, options['workers'], options['missing'])
+
+    def regenerate(self, model, field_name, workers, missing):
+        json_field = renditions_field(field_name)
+        queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        if missing:
+            queryset = queryset.filter(**{json_field: {}})
+        rows = queryset.order_by('pk').values_list('pk', field_name, json_field)
+
+        storage = model._meta.get_field(field_name).storage
+        previous = {}
+        tasks = []
+        for pk, name, renditions in rows.iterator(chunk_size=2000):
+            previous[pk] = renditions
+            tasks.append((model._meta.label, field_name, pk, name))
+
+        # Дочерние процессы не должны наследовать открытые соединения с базой
+        connections.close_all()
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for pk, renditions, error in executor.map(render_file, tasks, chunksize=16):
+                if error:
+                    failed += 1
+                    self.stderr.write(error)
+                    continue
+                delete_renditions(storage, previous[pk], keep=renditions)
+                model._default_manager.filter(pk=pk).update(**{json_field: renditions})
+                done += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{model._meta.verbose_name_plural}: обработано {done}, ошибок {failed}'
+        ))
@@ -0,0 +1,303 @@
+import json
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from ...metrics import QueryTimer
+from ...models import Adoption, Animal, CustomUser, Donation, Reservation
+from .seed_benchmark_data import USERNAME_PREFIX
+
+
+FILTER_FIELDS = {
+    'animal_type': Animal.ANIMAL_TYPES,
+    'age': Animal.AGE_CHOICES,
+    'gender': Animal.GENDER_CHOICES,
+    'size': Animal.SIZE_CHOICES,
+}
+
+SEARCH_QUERIES = ['рыжий', 'лабрадор ласковый']
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered, p):
+    """Перцентиль методом ближайшего ранга по отсортированному списку"""
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    summary = {f'p{p}_ms': round(percentile(ordered, p), 3) for p in PERCENTILES}
+    summary.update({
+        'mean_ms': round(sum(ordered) / len(ordered), 3),
+        'min_ms': round(ordered[0], 3),
+        'max_ms': round(ordered[-1], 3),
+        'samples': len(ordered),
+    })
+    return summary
+
+
+def git_revision():
+    """(коммит, есть ли незакоммиченные изменения) каталога приложения или (None, None)"""
+    path = apps.get_app_config('shelter').path
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=path, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=path, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеры публичных страниц на данных seed_benchmark_data: p50/p95/p99 '
+        'и число SQL-запросов каждого представления через тестовый клиент, '
+        'с --url — нагрузка на запущенный сервер из нескольких потоков. '
+        'Результаты пишутся в JSON и сравниваются с прошлым прогоном (--compare).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Замеров на представление')
+        parser.add_argument('--warmup', type=int, default=5, help='Запросов прогрева на представление')
+        parser.add_argument('--url', help='Адрес запущенного сервера для нагрузочного сценария')
+        parser.add_argument('--concurrency', type=int, default=8, help='Потоков нагрузки')
+        parser.add_argument('--duration', type=float, default=30, help='Длительность нагрузки, с')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно выбора страниц в нагрузке')
+        parser.add_argument('--output', help='Путь к JSON-файлу с результатами')
+        parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Ошибка, если p95 вырос больше чем на столько процентов или выросло число запросов'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios()
+        setup_test_environment()
+        try:
+            views = {
+                name: self.measure_view(path, user, options['warmup'], options['repeat'])
+                for name, path, user in scenarios
+            }
+        finally:
+            teardown_test_environment()
+
+        results = {'meta': self.meta(options), 'views': views, 'load': None}
+        self.print_views(views)
+
+        if options['url']:
+            public = {name: path for name, path, user in scenarios if user is None}
+            results['load'] = self.run_load(
+                options['url'], public, options['concurrency'], options['duration'], options['seed']
+            )
+            self.print_load(results['load'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                json.dump(results, fp, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as fp:
+                baseline = json.load(fp)
+            regressions = self.compare(baseline, results, options['max_regression'])
+            if regressions and options['max_regression'] is not None:
+                raise CommandError(f"Регрессии: {', '.join(regressions)}")
+
+    def scenarios(self):
+        """(название, путь, пользователь или None)"""
+        animal_id = Animal.objects.filter(status='available').order_by('pk').values_list('pk', flat=True).first()
+        # Профиль с самой длинной историей бронирований
+        user = CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).annotate(
+            history=Count('reservations')
+        ).order_by('-history', 'pk').first()
+        if animal_id is None or user is None:
+            raise CommandError('Нет данных для замеров: сначала выполните manage.py seed_benchmark_data')
+
+        animals_list = reverse('animals_list')
+        scenarios = [
+            ('home', reverse('home'), None),
+            ('animals_list', animals_list, None),
+            ('animals_list page=50', f'{animals_list}?page=50', None),
+            ('animals_list cursor', f'{animals_list}?cursor=', None),
+        ]
+        for field, choices in FILTER_FIELDS.items():
+            for value, _ in choices:
+                scenarios.append((f'animals_list {field}={value}', f'{animals_list}?{field}={value}', None))
+        all_filters = {field: choices[0][0] for field, choices in FILTER_FIELDS.items()}
+        scenarios.append(('animals_list все фильтры', f'{animals_list}?{urlencode(all_filters)}', None))
+        for query in SEARCH_QUERIES:
+            scenarios.append((f'animals_list search={query}', f"{animals_list}?{urlencode({'search': query})}", None))
+        scenarios.append((
+            'animals_list search+animal_type',
+            f"{animals_list}?{urlencode({'search': SEARCH_QUERIES[0], 'animal_type': 'cat'})}", None
+        ))
+        scenarios += [
+            ('animal_detail', reverse('animal_detail', args=[animal_id]), None),
+            ('profile', reverse('profile'), user),
+            ('about', reverse('about'), None),
+            ('donations_page', reverse('donations'), None),
+        ]
+        return scenarios
+
+    def measure_view(self, path, user, warmup, repeat):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        for _ in range(warmup):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path}: HTTP {response.status_code}')
+
+        timings = []
+        queries = 0
+        sql_timings = []
+        for _ in range(repeat):
+            # Обертка соединения, а не CaptureQueriesContext: тот теряет запросы,
+            # когда соединение закрывается в конце запроса
+            timer = QueryTimer()
+            started = time.perf_counter()
+            with connection.execute_wrapper(timer):
+                client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, timer.count)
+            sql_timings.append(timer.time * 1000)
+        return {
+            'path': path,
+            'queries': queries,
+            'sql_p50_ms': round(percentile(sorted(sql_timings), 50), 3),
+            **summarize(timings),
+        }
+
+    def run_load(self, base_url, paths, concurrency, duration, seed):
+        """Запросы к серверу из concurrency потоков в течение duration секунд"""
+        names = list(paths)
+        deadline = time.monotonic() + duration
+        samples = [[] for _ in range(concurrency)]
+
+        def worker(index):
+            # Свой генератор у потока: последовательность страниц повторяется между прогонами
+            rng = random.Random(seed + index)
+            while time.monotonic() < deadline:
+                name = rng.choice(names)
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(base_url.rstrip('/') + paths[name], timeout=30) as response:
+                        response.read()
+                        status = response.status
+                except urllib.error.HTTPError as error:
+                    status = error.code
+                except OSError:
+                    status = None
+                samples[index].append((name, (time.perf_counter() - started) * 1000, status))
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        merged = [sample for worker_samples in samples for sample in worker_samples]
+        ok = [sample for sample in merged if sample[2] == 200]
+        if not ok:
+            raise CommandError(f'{base_url}: ни одного успешного ответа за {duration} с')
+        return {
+            'url': base_url,
+            'concurrency': concurrency,
+            'duration_s': round(elapsed, 2),
+            'requests': len(merged),
+            'errors': len(merged) - len(ok),
+            'rps': round(len(ok) / elapsed, 1),
+            **summarize([latency for _, latency, _ in ok]),
+            'by_view': {
+                name: summarize(timings)
+                for name in names
+                if (timings := [latency for view, latency, _ in ok if view == name])
+            },
+        }
+
+    def meta(self, options):
+        commit, dirty = git_revision()
+        return {
+            'commit': commit,
+            'dirty': dirty,
+            'created': timezone.now().isoformat(),
+            'vendor': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeat': options['repeat'],
+            'rows': {
+                model._meta.model_name: model.objects.count()
+                for model in (CustomUser, Animal, Reservation, Adoption, Donation)
+            },
+        }
+
+    def print_views(self, views):
+        self.stdout.write(f"{'представление, мс':<40} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL p50':>8}  запросов")
+        for name, result in views.items():
+            self.stdout.write(
+                f"{name:<40} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['sql_p50_ms']:>8.2f}  {result['queries']}"
+            )
+
+    def print_load(self, load):
+        self.stdout.write(
+            f"Нагрузка {load['url']}, {load['concurrency']} потоков: {load['rps']} запр/с, "
+            f"p50 {load['p50_ms']:.1f} мс, p95 {load['p95_ms']:.1f} мс, p99 {load['p99_ms']:.1f} мс, "
+            f"ошибок {load['errors']} из {load['requests']}"
+        )
+
+    def compare(self, baseline, results, max_regression):
+        """Вывести изменения относительно baseline; вернуть представления с регрессией"""
+        old_meta, new_meta = baseline.get('meta', {}), results['meta']
+        self.stdout.write(f"Сравнение с {old_meta.get('commit') or old_meta.get('created', 'прошлым прогоном')}:")
+        if old_meta.get('rows') != new_meta['rows'] or old_meta.get('vendor') != new_meta['vendor']:
+            self.stdout.write(self.style.WARNING('Данные или СУБД отличаются: сравнение приблизительное'))
+
+        regressions = []
+        for name, new in results['views'].items():
+            old = baseline.get('views', {}).get(name)
+            if old is None:
+                continue
+            change = (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+            line = (
+                f"{name:<40} p50 {old['p50_ms']:.2f} -> {new['p50_ms']:.2f}  "
+                f"p95 {old['p95_ms']:.2f} -> {new['p95_ms']:.2f} ({change:+.0f}%)  "
+                f"запросов {old['queries']} -> {new['queries']}"
+            )
+            slower = max_regression is not None and change > max_regression
+            if slower or new['queries'] > old['queries']:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        old_load, new_load = baseline.get('load'), results['load']
+        if old_load and new_load:
+            self.stdout.write(
+                f"нагрузка: {old_load['rps']} -> {new_load['rps']} запр/с, "
+                f"p95 {old_load['p95_ms']:.1f} -> {new_load['p95_ms']:.1f} мс"
+            )
+        return regressions
@@ -0,0 +1,83 @@
+import multiprocessing
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ...jobs import prune_done_jobs, requeue_stale_jobs, run_pending_jobs, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди. С --processes запускает несколько '
+        'воркеров (задачи распределяются через SELECT ... FOR UPDATE SKIP LOCKED)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Количество процессов-воркеров')
+        parser.add_argument('--batch', type=int, default=10, help='Сколько задач забирать за раз')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Пауза, когда очередь пуста, с')
+        parser.add_argument(
+            '--stale-timeout', type=int, default=600,
+            help='Через сколько секунд задача зависшего воркера возвращается в очередь'
+        )
+        parser.add_argument(
+            '--prune-interval', type=int, default=3600,
+            help='Как часто удалять старые выполненные задачи, с (0 — не удалять)'
+        )
+        parser.add_argument('--once', action='store_true', help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            self.work(options)
+            return
+
+        # Дочерние процессы не должны наследовать открытые соединения с базой
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=self.work, args=(options,), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+
+    def work(self, options):
+        """Цикл воркера; завершается по SIGTERM/SIGINT после текущей пачки"""
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        name = worker_name()
+        stale_timeout = timedelta(seconds=options['stale_timeout'])
+        prune_interval = options['prune_interval']
+        pruned_at = 0
+        total_done = total_failed = 0
+
+        try:
+            while not stopping:
+                if prune_interval and time.monotonic() - pruned_at >= prune_interval:
+                    prune_done_jobs()
+                    pruned_at = time.monotonic()
+                requeue_stale_jobs(stale_timeout)
+                done, failed = run_pending_jobs(options['batch'], name)
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connections.close_all()
+
+        self.stdout.write(f'{name}: выполнено {total_done}, с ошибкой {total_failed}')
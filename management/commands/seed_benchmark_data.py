@@ -0,0 +1,231 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from ...admin_search import SEARCH_DOCUMENT_FIELDS, refresh_search_documents
+from ...facets import invalidate_facet_counts
+from ...leaderboard import rebuild_donor_totals
+from ...models import Adoption, Animal, CustomUser, Donation, Reservation
+from ...recommendations import rebuild_similar_animals
+from ...search import update_search_index
+from ...stats import rebuild_animal_statistics
+
+
+# Объемы при --scale 1
+VOLUMES = {
+    'users': 200_000,
+    'animals': 100_000,
+    'reservations': 1_000_000,
+    'donations': 500_000,
+}
+
+USERNAME_PREFIX = 'bench-'
+
+# Данные отсчитываются от фиксированной даты, чтобы не зависеть от дня запуска
+END = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+HISTORY_DAYS = 3 * 365
+
+FIRST_NAMES = ['Анна', 'Иван', 'Мария', 'Сергей', 'Ольга', 'Дмитрий', 'Елена', 'Алексей', 'Наталья', 'Павел']
+LAST_NAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Морозов']
+PET_NAMES = ['Барсик', 'Мурка', 'Шарик', 'Рыжик', 'Дружок', 'Пушок', 'Лаки', 'Буся', 'Граф', 'Соня', 'Тишка', 'Джек']
+BREEDS = {
+    'dog': ['Метис', 'Лабрадор', 'Овчарка', 'Дворняга', 'Такса', 'Хаски', 'Спаниель', 'Терьер'],
+    'cat': ['Метис', 'Британская', 'Сиамская', 'Мейн-кун', 'Дворовая', 'Сфинкс', 'Персидская'],
+    'other': ['Кролик', 'Морская свинка', 'Хомяк', 'Попугай', 'Шиншилла'],
+}
+COLORS = ['рыжий', 'черный', 'белый', 'серый', 'трехцветный', 'пятнистый', 'коричневый']
+TRAITS = ['ласковый', 'игривый', 'спокойный', 'активный', 'любит детей', 'приучен к лотку', 'ладит с кошками']
+AMOUNTS = [Decimal(value) for value in ('100', '300', '500', '1000', '2000', '5000')]
+
+# Значения и веса
+ANIMAL_TYPE_WEIGHTS = [('dog', 50), ('cat', 40), ('other', 10)]
+ANIMAL_STATUS_WEIGHTS = [('available', 60), ('reserved', 10), ('adopted', 30)]
+RESERVATION_STATUS_WEIGHTS = [('pending', 10), ('confirmed', 15), ('completed', 60), ('cancelled', 15)]
+PAYMENT_STATUS_WEIGHTS = [('completed', 85), ('pending', 8), ('failed', 5), ('refunded', 2)]
+
+
+def weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights)[0]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Не подставлять auto_now/auto_now_add: даты создания задает генератор"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет пустую базу детерминированными данными для run_benchmarks: '
+        f"{VOLUMES['users']} пользователей, {VOLUMES['animals']} животных, "
+        f"{VOLUMES['reservations']} бронирований, {VOLUMES['donations']} пожертвований "
+        '(при --scale 1). Затем пересчитывает поисковые индексы, статистику, '
+        'рейтинг доноров и похожих животных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Множитель объемов')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора данных')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Строк в одном bulk_create')
+
+    def handle(self, *args, **options):
+        if CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('Данные для замеров уже созданы; запустите команду на пустой базе')
+
+        volumes = {name: max(1, int(count * options['scale'])) for name, count in VOLUMES.items()}
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        with explicit_timestamps(CustomUser, Animal, Reservation, Adoption, Donation):
+            with transaction.atomic():
+                user_ids = self.step('пользователи', self.create_users, volumes['users'])
+                animal_ids = self.step('животные', self.create_animals, volumes['animals'])
+                self.step('усыновления', self.create_adoptions, user_ids)
+                self.step('бронирования', self.create_reservations, volumes['reservations'], user_ids, animal_ids)
+                self.step('пожертвования', self.create_donations, volumes['donations'], user_ids)
+        self.step('производные данные', self.rebuild_derived, animal_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.perf_counter() - started:.0f} с: '
+            + ', '.join(f'{name} {count}' for name, count in volumes.items())
+        ))
+
+    def step(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f'{label}: {time.perf_counter() - started:.1f} с')
+        return result
+
+    def timestamp(self):
+        return END - timedelta(seconds=self.rng.randrange(HISTORY_DAYS * 86400))
+
+    def insert(self, model, objects):
+        """bulk_create пачками; возвращает pk созданных строк"""
+        ids = []
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                ids.extend(obj.pk for obj in model.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            ids.extend(obj.pk for obj in model.objects.bulk_create(batch))
+        return ids
+
+    def create_users(self, count):
+        # Замеры входят через force_login; make_password(None) дал бы случайную строку
+        password = f'{UNUSABLE_PASSWORD_PREFIX}benchmark'
+
+        def make(i):
+            first_name = self.rng.choice(FIRST_NAMES)
+            joined = self.timestamp()
+            return CustomUser(
+                username=f'{USERNAME_PREFIX}{i:06d}', email=f'user{i}@bench.example.com',
+                first_name=first_name, last_name=self.rng.choice(LAST_NAMES),
+                phone=f'+7900{i:07d}', password=password,
+                date_joined=joined, created_at=joined, updated_at=joined,
+            )
+
+        return self.insert(CustomUser, (make(i) for i in range(count)))
+
+    def create_animals(self, count):
+        def make(i):
+            animal_type = weighted(self.rng, ANIMAL_TYPE_WEIGHTS)
+            breed = self.rng.choice(BREEDS[animal_type])
+            color = self.rng.choice(COLORS)
+            created = self.timestamp()
+            return Animal(
+                name=f'{self.rng.choice(PET_NAMES)} {i}',
+                animal_type=animal_type,
+                breed=breed,
+                age=self.rng.choice(Animal.AGE_CHOICES)[0],
+                gender=self.rng.choice(Animal.GENDER_CHOICES)[0],
+                size=self.rng.choice(Animal.SIZE_CHOICES)[0],
+                color=color,
+                description=f'{breed}, {color}, ' + ', '.join(self.rng.sample(TRAITS, 2)),
+                status=weighted(self.rng, ANIMAL_STATUS_WEIGHTS),
+                arrival_date=created.date(),
+                vaccinated=self.rng.random() < 0.7,
+                sterilized=self.rng.random() < 0.5,
+                created_at=created, updated_at=created,
+            )
+
+        return self.insert(Animal, (make(i) for i in range(count)))
+
+    def create_adoptions(self, user_ids):
+        adopted = Animal.objects.filter(status='adopted').order_by('pk').values_list('pk', 'created_at')
+
+        def make(animal_id, arrived):
+            created = arrived + timedelta(days=self.rng.randrange(1, 90))
+            return Adoption(
+                animal_id=animal_id, user_id=self.rng.choice(user_ids), status='completed',
+                adoption_date=created.date(), created_at=created, updated_at=created,
+            )
+
+        return self.insert(Adoption, (make(*row) for row in adopted.iterator()))
+
+    def create_reservations(self, count, user_ids, animal_ids):
+        def make(i):
+            created = self.timestamp()
+            user_index = self.rng.randrange(len(user_ids)) if self.rng.random() < 0.8 else None
+            return Reservation(
+                animal_id=self.rng.choice(animal_ids),
+                user_id=user_ids[user_index] if user_index is not None else None,
+                name=self.rng.choice(FIRST_NAMES),
+                phone=f'+7901{i:07d}',
+                email=f'visitor{i}@bench.example.com',
+                visit_date=(created + timedelta(days=self.rng.randrange(1, 14))).date(),
+                status=weighted(self.rng, RESERVATION_STATUS_WEIGHTS),
+                created_at=created, updated_at=created,
+            )
+
+        return self.insert(Reservation, (make(i) for i in range(count)))
+
+    def create_donations(self, count, user_ids):
+        def make(i):
+            created = self.timestamp()
+            user_id = self.rng.choice(user_ids) if self.rng.random() < 0.7 else None
+            return Donation(
+                user_id=user_id,
+                name=f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}',
+                email=f'donor{i}@bench.example.com',
+                amount=self.rng.choice(AMOUNTS),
+                is_anonymous=self.rng.random() < 0.1,
+                payment_status=weighted(self.rng, PAYMENT_STATUS_WEIGHTS),
+                transaction_id=f'bench-{i}',
+                created_at=created, updated_at=created,
+            )
+
+        return self.insert(Donation, (make(i) for i in range(count)))
+
+    def rebuild_derived(self, animal_ids):
+        """Таблицы и индексы, которые в обычной работе обновляют сигналы"""
+        for start in range(0, len(animal_ids), self.batch_size):
+            with transaction.atomic():
+                update_search_index(animal_ids[start:start + self.batch_size])
+        for model in SEARCH_DOCUMENT_FIELDS:
+            refresh_search_documents(model._default_manager.all())
+        rebuild_animal_statistics()
+        rebuild_donor_totals()
+        rebuild_similar_animals()
+        invalidate_facet_counts()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
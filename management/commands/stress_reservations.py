@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from ...models import Animal, Reservation
+from ...services import AnimalUnavailable, claim_animal
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочная проверка бронирования: много параллельных заявок '
+        'на одно животное должны дать ровно одну бронь'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--claims', type=int, default=300, help='Количество параллельных заявок')
+        parser.add_argument('--threads', type=int, default=50, help='Количество потоков')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовое животное и брони')
+
+    def handle(self, *args, **options):
+        animal = Animal.objects.create(
+            name='Нагрузочный тест',
+            animal_type='other',
+            age='adult',
+            gender='male',
+            size='medium',
+            description='Создано командой stress_reservations',
+        )
+        # Первая волна потоков стартует одновременно
+        parties = min(options['threads'], options['claims'])
+        start = threading.Barrier(parties)
+
+        def attempt(i):
+            try:
+                if i < parties:
+                    start.wait(timeout=10)
+                claim_animal(
+                    animal,
+                    name=f'Заявка {i}',
+                    phone='+70000000000',
+                    email=f'stress{i}@example.com',
+                    visit_date=timezone.localdate(),
+                )
+                return 'claimed'
+            except AnimalUnavailable:
+                return 'unavailable'
+            except DatabaseError:
+                return 'error'
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            outcomes = list(executor.map(attempt, range(options['claims'])))
+        elapsed = time.perf_counter() - started
+
+        reservations = Reservation.objects.filter(animal=animal).count()
+        status = Animal.objects.filter(pk=animal.pk).values_list('status', flat=True).get()
+
+        self.stdout.write(
+            f"Заявок: {len(outcomes)} за {elapsed:.2f} с; "
+            f"успешных: {outcomes.count('claimed')}, "
+            f"отказов: {outcomes.count('unavailable')}, "
+            f"ошибок БД: {outcomes.count('error')}"
+        )
+        self.stdout.write(f'Броней в базе: {reservations}, статус животного: {status}')
+
+        if not options['keep']:
+            with transaction.atomic():
+                animal.delete()
+
+        if reservations != 1 or outcomes.count('claimed') != 1 or status != 'reserved':
+            raise CommandError('Нарушена атомарность бронирования')
+        self.stdout.write(self.style.SUCCESS('Двойных бронирований нет'))
@@ -0,0 +1,281 @@
+"""
+Метрики запросов в формате Prometheus.
+
+MetricsMiddleware для каждого запроса записывает время ответа, число
+SQL-запросов, суммарное время SQL и размер ответа в гистограммы с
+метками view (имя URL из urls.py) и method, а также счетчик ответов по
+статусам. Запись — это несколько операций со списками в памяти процесса
+под блокировкой, без обращений к базе, кешу или файлам.
+
+Несколько воркеров gunicorn: при SHELTER_METRICS_DIR каждый процесс раз
+в SHELTER_METRICS_FLUSH_INTERVAL секунд атомарно (через os.replace)
+записывает свои значения в отдельный файл этого каталога, а страница
+/metrics/ складывает файлы всех процессов. Каталог нужно очищать при
+перезапуске сервиса, иначе счетчики старых процессов останутся в сумме.
+
+Страница метрик доступна с заголовком Authorization: Bearer
+<SHELTER_METRICS_TOKEN>; без токена в настройках — только при DEBUG.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+from django.utils.crypto import constant_time_compare
+
+
+# Название, описание, границы корзин
+HISTOGRAMS = {
+    'shelter_http_request_duration_seconds': (
+        'Время обработки запроса, с',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ),
+    'shelter_http_request_queries': (
+        'Число SQL-запросов на запрос',
+        (0, 1, 2, 3, 5, 8, 13, 20, 50, 100),
+    ),
+    'shelter_http_request_sql_seconds': (
+        'Суммарное время SQL-запросов на запрос, с',
+        (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    ),
+    'shelter_http_response_size_bytes': (
+        'Размер тела ответа, байт',
+        (1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+
+LABELS = ('view', 'method')
+
+RESPONSES_TOTAL = 'shelter_http_responses_total'
+RESPONSES_HELP = 'Число ответов по статусам'
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# Запросы, не попавшие ни в один URL (404 до представления)
+UNRESOLVED = '<unresolved>'
+
+
+class MetricsRegistry:
+    """Гистограммы и счетчики одного процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._next_flush = 0.0
+        # (метрика, метки) -> [счетчики корзин..., +Inf, сумма]
+        self.histograms = {}
+        # (метрика, метки) -> значение
+        self.counters = {}
+
+    def record(self, observations, counter_labels=None):
+        """
+        Записать значения гистограмм и увеличить счетчик ответов под одной блокировкой.
+
+        observations: [(метрика, метки, значение)].
+        """
+        updates = [
+            ((name, labels), bisect_left(HISTOGRAMS[name][1], value), value)
+            for name, labels, value in observations
+        ]
+        with self._lock:
+            for key, index, value in updates:
+                series = self.histograms.get(key)
+                if series is None:
+                    series = self.histograms[key] = [0] * (len(HISTOGRAMS[key[0]][1]) + 2)
+                series[index] += 1
+                series[-1] += value
+            if counter_labels is not None:
+                key = (RESPONSES_TOTAL, counter_labels)
+                self.counters[key] = self.counters.get(key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': [
+                    [name, list(labels), list(series)]
+                    for (name, labels), series in self.histograms.items()
+                ],
+                'counters': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def maybe_flush(self):
+        """Записать файл процесса, если прошло SHELTER_METRICS_FLUSH_INTERVAL секунд"""
+        # Настройки читаются только раз в интервал: это самая дорогая часть записи запроса
+        if time.monotonic() < self._next_flush:
+            return
+        # Пишет один поток; остальные не ждут
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = time.monotonic() + getattr(settings, 'SHELTER_METRICS_FLUSH_INTERVAL', 5)
+            directory = metrics_dir()
+            if directory:
+                self.flush(directory)
+        finally:
+            self._flush_lock.release()
+
+    def flush(self, directory):
+        path = process_file(directory)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as fp:
+            json.dump(self.snapshot(), fp)
+        os.replace(temporary, path)
+
+
+registry = MetricsRegistry()
+
+
+def metrics_dir():
+    return getattr(settings, 'SHELTER_METRICS_DIR', None)
+
+
+def process_file(directory):
+    return os.path.join(directory, f'metrics-{os.getpid()}.json')
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    return match.view_name
+
+
+def record_request(request, response, duration, queries, sql_time):
+    """Записать метрики одного запроса"""
+    labels = (view_label(request), request.method if request.method in METHODS else 'OTHER')
+    observations = [
+        ('shelter_http_request_duration_seconds', labels, duration),
+        ('shelter_http_request_queries', labels, queries),
+        ('shelter_http_request_sql_seconds', labels, sql_time),
+    ]
+    if not response.streaming:
+        observations.append(('shelter_http_response_size_bytes', labels, len(response.content)))
+    registry.record(observations, labels + (str(response.status_code),))
+    registry.maybe_flush()
+
+
+class QueryTimer:
+    """execute_wrapper: число и суммарное время SQL-запросов текущего соединения"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """
+    Метрики запросов; ставится первым в MIDDLEWARE, чтобы учитывать
+    время остальных middleware.
+
+    Только синхронный: под ASGI Django переводит в поток всю цепочку
+    сразу, и представление работает с тем же соединением, на котором
+    установлен счетчик SQL-запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        record_request(request, response, time.perf_counter() - started, timer.count, timer.time)
+        return response
+
+
+def collect():
+    """Значения всех процессов (из файлов каталога) вместе с текущим"""
+    snapshots = [registry.snapshot()]
+    directory = metrics_dir()
+    if directory:
+        own = process_file(directory)
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            if path == own:
+                continue
+            try:
+                with open(path, encoding='utf-8') as fp:
+                    snapshots.append(json.load(fp))
+            except (OSError, ValueError):
+                # Файл процесса, который как раз завершается
+                continue
+
+    histograms = {}
+    counters = {}
+    for snapshot in snapshots:
+        for name, labels, series in snapshot['histograms']:
+            if name not in HISTOGRAMS:
+                continue
+            key = (name, tuple(labels))
+            total = histograms.setdefault(key, [0] * len(series))
+            for index, value in enumerate(series):
+                total[index] += value
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+
+def format_number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_metrics():
+    """Текст в формате Prometheus (text/plain; version=0.0.4)"""
+    histograms, counters = collect()
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], series[:-1]):
+                cumulative += count
+                le = 'le="{}"'.format(bound if bound == '+Inf' else format_number(bound))
+                lines.append(f'{name}_bucket{format_labels(LABELS, labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(LABELS, labels)} {format_number(series[-1])}')
+            lines.append(f'{name}_count{format_labels(LABELS, labels)} {cumulative}')
+
+    lines.append(f'# HELP {RESPONSES_TOTAL} {RESPONSES_HELP}')
+    lines.append(f'# TYPE {RESPONSES_TOTAL} counter')
+    for (name, labels), value in sorted(counters.items()):
+        if name == RESPONSES_TOTAL:
+            lines.append(f'{name}{format_labels(LABELS + ("status",), labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed(request):
+    token = getattr(settings, 'SHELTER_METRICS_TOKEN', None)
+    if token:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    return settings.DEBUG
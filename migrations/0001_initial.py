@@ -0,0 +1,161 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:52
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Animal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Имя')),
+                ('animal_type', models.CharField(choices=[('dog', 'Собака'), ('cat', 'Кошка'), ('other', 'Другое')], max_length=10, verbose_name='Тип животного')),
+                ('breed', models.CharField(blank=True, max_length=100, verbose_name='Порода')),
+                ('age', models.CharField(choices=[('young', 'До 1 года'), ('adult', '1-7 лет'), ('senior', 'Старше 7 лет')], max_length=10, verbose_name='Возраст')),
+                ('gender', models.CharField(choices=[('male', 'Самец'), ('female', 'Самка')], max_length=10, verbose_name='Пол')),
+                ('size', models.CharField(choices=[('small', 'Маленький'), ('medium', 'Средний'), ('large', 'Крупный')], max_length=10, verbose_name='Размер')),
+                ('color', models.CharField(blank=True, max_length=50, verbose_name='Окрас')),
+                ('description', models.TextField(verbose_name='Описание')),
+                ('health_status', models.TextField(blank=True, verbose_name='Состояние здоровья')),
+                ('photo', models.ImageField(blank=True, null=True, upload_to='animals/', verbose_name='Фото')),
+                ('status', models.CharField(choices=[('available', 'В приюте'), ('reserved', 'Забронирован'), ('adopted', 'Усыновлен')], default='available', max_length=20, verbose_name='Статус')),
+                ('arrival_date', models.DateField(auto_now_add=True, verbose_name='Дата поступления')),
+                ('vaccinated', models.BooleanField(default=False, verbose_name='Привит')),
+                ('sterilized', models.BooleanField(default=False, verbose_name='Стерилизован')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Животное',
+                'verbose_name_plural': 'Животные',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('phone', models.CharField(blank=True, max_length=17, validators=[django.core.validators.RegexValidator(message="Номер телефона должен быть в формате: '+999999999'. До 15 цифр.", regex='^\\+?1?\\d{9,15}$')], verbose_name='Телефон')),
+                ('avatar', models.ImageField(blank=True, null=True, upload_to='avatars/', verbose_name='Аватар')),
+                ('date_of_birth', models.DateField(blank=True, null=True, verbose_name='Дата рождения')),
+                ('address', models.TextField(blank=True, verbose_name='Адрес')),
+                ('is_verified', models.BooleanField(default=False, verbose_name='Подтвержден')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата регистрации')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'Пользователь',
+                'verbose_name_plural': 'Пользователи',
+                'ordering': ['-created_at'],
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Adoption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'На рассмотрении'), ('approved', 'Одобрено'), ('rejected', 'Отклонено'), ('completed', 'Завершено')], default='pending', max_length=20, verbose_name='Статус')),
+                ('adoption_date', models.DateField(blank=True, null=True, verbose_name='Дата усыновления')),
+                ('notes', models.TextField(blank=True, verbose_name='Примечания')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adoptions', to=settings.AUTH_USER_MODEL, verbose_name='Усыновитель')),
+                ('animal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='adoption', to='shelter.animal', verbose_name='Животное')),
+            ],
+            options={
+                'verbose_name': 'Усыновление',
+                'verbose_name_plural': 'Усыновления',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Donation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Имя донора')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='Email')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Сумма')),
+                ('message', models.TextField(blank=True, verbose_name='Сообщение')),
+                ('is_anonymous', models.BooleanField(default=False, verbose_name='Анонимно')),
+                ('payment_status', models.CharField(choices=[('pending', 'Ожидает оплаты'), ('completed', 'Оплачено'), ('failed', 'Ошибка'), ('refunded', 'Возвращено')], default='pending', max_length=20, verbose_name='Статус платежа')),
+                ('transaction_id', models.CharField(blank=True, max_length=100, verbose_name='ID транзакции')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donations', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Пожертвование',
+                'verbose_name_plural': 'Пожертвования',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Имя')),
+                ('phone', models.CharField(max_length=17, verbose_name='Телефон')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('visit_date', models.DateField(verbose_name='Дата посещения')),
+                ('comment', models.TextField(blank=True, verbose_name='Комментарий')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтверждено'), ('completed', 'Завершено'), ('cancelled', 'Отменено')], default='pending', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='shelter.animal', verbose_name='Животное')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Бронирование',
+                'verbose_name_plural': 'Бронирования',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupportRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Имя')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('subject', models.CharField(choices=[('adoption', 'Вопрос об усыновлении'), ('volunteer', 'Волонтерство'), ('donation', 'Пожертвования'), ('technical', 'Технические проблемы'), ('other', 'Другое')], max_length=20, verbose_name='Тема')),
+                ('message', models.TextField(verbose_name='Сообщение')),
+                ('status', models.CharField(choices=[('new', 'Новое'), ('in_progress', 'В обработке'), ('resolved', 'Решено'), ('closed', 'Закрыто')], default='new', max_length=20, verbose_name='Статус')),
+                ('response', models.TextField(blank=True, verbose_name='Ответ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='support_requests', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Обращение в поддержку',
+                'verbose_name_plural': 'Обращения в поддержку',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
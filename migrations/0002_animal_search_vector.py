@@ -0,0 +1,52 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс и заполнение tsvector (PostgreSQL) или таблица FTS5 (SQLite)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX shelter_animal_search_gin ON shelter_animal USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE shelter_animal SET search_vector = "
+            "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(breed, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), 'C')"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE shelter_animal_fts USING fts5("
+            "name, breed, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO shelter_animal_fts (rowid, name, breed, description) '
+            'SELECT id, name, breed, description FROM shelter_animal'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS shelter_animal_search_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS shelter_animal_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0002_animal_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['-created_at'], name='animal_available_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['animal_type', '-created_at'], name='animal_available_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['age', '-created_at'], name='animal_available_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['gender', '-created_at'], name='animal_available_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['size', '-created_at'], name='animal_available_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['status', 'animal_type'], name='animal_status_type_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:56
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_statistics(apps, schema_editor):
+    Animal = apps.get_model('shelter', 'Animal')
+    AnimalStatistics = apps.get_model('shelter', 'AnimalStatistics')
+
+    rows = {'all': AnimalStatistics(animal_type='all')}
+    grouped = Animal.objects.values('animal_type', 'status').annotate(count=Count('pk')).order_by()
+    for row in grouped:
+        for key in (row['animal_type'], 'all'):
+            statistics = rows.setdefault(key, AnimalStatistics(animal_type=key))
+            statistics.total += row['count']
+            if row['status'] in ('available', 'reserved', 'adopted'):
+                setattr(statistics, row['status'], getattr(statistics, row['status']) + row['count'])
+    AnimalStatistics.objects.bulk_create(rows.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0003_animal_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnimalStatistics',
+            fields=[
+                ('animal_type', models.CharField(max_length=10, primary_key=True, serialize=False, verbose_name='Тип животного')),
+                ('total', models.IntegerField(default=0, verbose_name='Всего')),
+                ('available', models.IntegerField(default=0, verbose_name='В приюте')),
+                ('reserved', models.IntegerField(default=0, verbose_name='Забронировано')),
+                ('adopted', models.IntegerField(default=0, verbose_name='Усыновлено')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Статистика животных',
+                'verbose_name_plural': 'Статистика животных',
+            },
+        ),
+        migrations.RunPython(populate_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0004_animalstatistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='photo_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Превью фото'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Превью аватара'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# Индексы под поиск по префиксу (istartswith) в автодополнении админки.
+# Django строит для istartswith условие UPPER(col::text) LIKE UPPER('...%'),
+# text_pattern_ops позволяет использовать для него B-tree при любой локали.
+PREFIX_INDEXES = [
+    ('animal_name_prefix_idx', 'shelter_animal', 'name'),
+    ('animal_breed_prefix_idx', 'shelter_animal', 'breed'),
+    ('user_username_prefix_idx', 'shelter_customuser', 'username'),
+    ('user_email_prefix_idx', 'shelter_customuser', 'email'),
+    ('user_first_name_prefix_idx', 'shelter_customuser', 'first_name'),
+    ('user_last_name_prefix_idx', 'shelter_customuser', 'last_name'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in PREFIX_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX {name} ON {table} (UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0005_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,97 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+
+# Состав search_document на момент миграции (см. admin_search.SEARCH_DOCUMENT_FIELDS)
+SEARCH_DOCUMENT_FIELDS = {
+    'customuser': ['username', 'email', 'first_name', 'last_name', 'phone'],
+    'reservation': ['name', 'phone', 'email', 'animal__name'],
+    'supportrequest': ['name', 'email', 'message'],
+    'adoption': ['animal__name', 'user__first_name', 'user__last_name', 'user__email'],
+    'donation': ['name', 'email', 'user__first_name', 'user__last_name', 'transaction_id'],
+}
+
+
+def document_expression(model, paths):
+    parts = []
+    for path in paths:
+        if '__' in path:
+            relation, field = path.split('__', 1)
+            foreign_key = model._meta.get_field(relation)
+            value = Subquery(
+                foreign_key.related_model._default_manager.filter(
+                    pk=OuterRef(foreign_key.attname)
+                ).values(field)[:1]
+            )
+        else:
+            value = F(path)
+        parts += [Coalesce(value, Value(''), output_field=TextField()), Value(' ')]
+    return Concat(*parts[:-1], output_field=TextField())
+
+
+def fill_search_documents(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for model_name, paths in SEARCH_DOCUMENT_FIELDS.items():
+        model = apps.get_model('shelter', model_name)
+        model._default_manager.using(db_alias).update(
+            search_document=document_expression(model, paths)
+        )
+
+
+# GIN-индекс по триграммам для search_document__icontains:
+# Django строит условие UPPER(search_document::text) LIKE UPPER('%...%')
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name in SEARCH_DOCUMENT_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX {model_name}_search_trgm ON shelter_{model_name} '
+            f'USING gin (UPPER(search_document::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name in SEARCH_DOCUMENT_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {model_name}_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0006_autocomplete_prefix_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='adoption',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Поисковый текст'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Поисковый текст'),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Поисковый текст'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Поисковый текст'),
+        ),
+        migrations.AddField(
+            model_name='supportrequest',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Поисковый текст'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
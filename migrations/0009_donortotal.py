@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_donor_totals(apps, schema_editor):
+    Donation = apps.get_model('shelter', 'Donation')
+    DonorTotal = apps.get_model('shelter', 'DonorTotal')
+
+    grouped = Donation.objects.filter(
+        payment_status='completed', is_anonymous=False, user__isnull=False
+    ).values('user').annotate(total=Sum('amount'), donations=Count('pk')).order_by('user_id')
+    DonorTotal.objects.bulk_create([
+        DonorTotal(user_id=row['user'], total=row['total'], donations=row['donations'])
+        for row in grouped
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0008_profile_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorTotal',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='donor_total', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+                ('donations', models.IntegerField(default=0, verbose_name='Количество пожертвований')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Итог донора',
+                'verbose_name_plural': 'Рейтинг доноров',
+                'indexes': [models.Index(fields=['-total', 'user'], name='donor_total_rank_idx')],
+            },
+        ),
+        migrations.RunPython(populate_donor_totals, migrations.RunPython.noop),
+    ]
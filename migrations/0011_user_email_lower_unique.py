@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:18
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    CustomUser = apps.get_model('shelter', 'CustomUser')
+    duplicates = list(
+        CustomUser.objects.exclude(email='').annotate(email_lower=Lower('email'))
+        .values('email_lower').annotate(users=Count('pk')).filter(users__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Нельзя создать уникальный индекс по email: адреса повторяются без учета '
+            'регистра (' + ', '.join(duplicates) + '). Объедините или исправьте эти учетные записи.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('shelter', '0010_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_lower_unique', violation_error_message='Пользователь с таким email уже существует'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0011_user_email_lower_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarAnimal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Позиция')),
+                ('distance', models.FloatField(verbose_name='Расстояние')),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='shelter.animal', verbose_name='Животное')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='shelter.animal', verbose_name='Похожее животное')),
+            ],
+            options={
+                'verbose_name': 'Похожее животное',
+                'verbose_name_plural': 'Похожие животные',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similaranimal',
+            constraint=models.UniqueConstraint(fields=('animal', 'rank'), name='similar_animal_rank_unique'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-17 09:40
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+FIELDS = ('total', 'available', 'reserved', 'adopted')
+
+
+def remove_total_row(apps, schema_editor):
+    AnimalStatistics = apps.get_model('shelter', 'AnimalStatistics')
+    AnimalStatistics.objects.filter(animal_type='all').delete()
+
+
+def restore_total_row(apps, schema_editor):
+    AnimalStatistics = apps.get_model('shelter', 'AnimalStatistics')
+    sums = AnimalStatistics.objects.aggregate(**{field: Sum(field) for field in FIELDS})
+    AnimalStatistics.objects.create(
+        animal_type='all',
+        **{field: sums[field] or 0 for field in FIELDS}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0012_similaranimal'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_total_row, restore_total_row),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-17 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter', '0013_remove_statistics_total_row'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status', 'done')), fields=['updated_at'], name='job_done_updated_idx'),
+        ),
+    ]
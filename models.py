@@ -1,8 +1,14 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinLengthValidator, RegexValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .renditions import FIELD_RENDITIONS, rendition_urls
+
 
 class CustomUser(AbstractUser):
     """Расширенная модель пользователя"""
@@ -23,6 +29,12 @@ class CustomUser(AbstractUser):
         null=True,
         verbose_name='Аватар'
     )
+    avatar_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Превью аватара'
+    )
     date_of_birth = models.DateField(
         blank=True,
         null=True,
@@ -45,14 +57,35 @@ class CustomUser(AbstractUser):
         verbose_name='Дата обновления'
     )
 
+    search_document = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Поисковый текст'
+    )
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['-created_at']
+        constraints = [
+            # Вход по email без учета регистра (auth_backends.EmailBackend).
+            # Пустой email (например, у createsuperuser) не участвует
+            models.UniqueConstraint(
+                Lower('email'),
+                name='user_email_lower_unique',
+                condition=~Q(email=''),
+                violation_error_message='Пользователь с таким email уже существует'
+            ),
+        ]
 
     def __str__(self):
         return self.get_full_name() or self.username
 
+    @property
+    def avatar_urls(self):
+        """URL превью аватара: avatar_urls.avatar.webp"""
+        return rendition_urls(self.avatar, self.avatar_renditions, FIELD_RENDITIONS['avatar'])
+
 
 class Animal(models.Model):
     """Модель животного"""
@@ -132,6 +165,12 @@ class Animal(models.Model):
         null=True,
         verbose_name='Фото'
     )
+    photo_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Превью фото'
+    )
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -158,11 +197,50 @@ class Animal(models.Model):
         auto_now=True,
         verbose_name='Дата обновления'
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
 
     class Meta:
         verbose_name = 'Животное'
         verbose_name_plural = 'Животные'
         ordering = ['-created_at']
+        indexes = [
+            # Публичные страницы показывают только доступных животных,
+            # отсортированных по дате добавления, поэтому индексы частичные
+            models.Index(
+                fields=['-created_at'],
+                name='animal_available_created_idx',
+                condition=Q(status='available')
+            ),
+            models.Index(
+                fields=['animal_type', '-created_at'],
+                name='animal_available_type_idx',
+                condition=Q(status='available')
+            ),
+            models.Index(
+                fields=['age', '-created_at'],
+                name='animal_available_age_idx',
+                condition=Q(status='available')
+            ),
+            models.Index(
+                fields=['gender', '-created_at'],
+                name='animal_available_gender_idx',
+                condition=Q(status='available')
+            ),
+            models.Index(
+                fields=['size', '-created_at'],
+                name='animal_available_size_idx',
+                condition=Q(status='available')
+            ),
+            # Подсчеты по статусам (страница "О приюте", админка)
+            models.Index(
+                fields=['status', 'animal_type'],
+                name='animal_status_type_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_animal_type_display()})"
@@ -176,6 +254,85 @@ class Animal(models.Model):
         }
         return emoji_map.get(self.animal_type, '🐾')
 
+    @property
+    def photo_urls(self):
+        """URL превью фото: photo_urls.card.webp, photo_urls.detail.jpeg и т.д."""
+        return rendition_urls(self.photo, self.photo_renditions, FIELD_RENDITIONS['photo'])
+
+
+class AnimalStatistics(models.Model):
+    """Денормализованные счетчики животных по типам"""
+    ALL = 'all'
+
+    animal_type = models.CharField(
+        max_length=10,
+        primary_key=True,
+        verbose_name='Тип животного'
+    )
+    total = models.IntegerField(
+        default=0,
+        verbose_name='Всего'
+    )
+    available = models.IntegerField(
+        default=0,
+        verbose_name='В приюте'
+    )
+    reserved = models.IntegerField(
+        default=0,
+        verbose_name='Забронировано'
+    )
+    adopted = models.IntegerField(
+        default=0,
+        verbose_name='Усыновлено'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика животных'
+        verbose_name_plural = 'Статистика животных'
+
+    def __str__(self):
+        return f"{self.animal_type}: {self.available}/{self.total}"
+
+
+class SimilarAnimal(models.Model):
+    """Предрасчитанная рекомендация: похожее доступное животное (см. recommendations.py)"""
+    animal = models.ForeignKey(
+        Animal,
+        on_delete=models.CASCADE,
+        related_name='similar_entries',
+        verbose_name='Животное'
+    )
+    neighbor = models.ForeignKey(
+        Animal,
+        on_delete=models.CASCADE,
+        related_name='recommended_for',
+        verbose_name='Похожее животное'
+    )
+    rank = models.PositiveSmallIntegerField(
+        verbose_name='Позиция'
+    )
+    distance = models.FloatField(
+        verbose_name='Расстояние'
+    )
+
+    class Meta:
+        verbose_name = 'Похожее животное'
+        verbose_name_plural = 'Похожие животные'
+        constraints = [
+            # Список для страницы животного читается по этому индексу
+            models.UniqueConstraint(
+                fields=['animal', 'rank'],
+                name='similar_animal_rank_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.animal_id} -> {self.neighbor_id} ({self.rank})"
+
 
 class Reservation(models.Model):
     """Модель бронирования встречи"""
@@ -233,10 +390,23 @@ class Reservation(models.Model):
         verbose_name='Дата обновления'
     )
 
+    search_document = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Поисковый текст'
+    )
+
     class Meta:
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
         ordering = ['-created_at']
+        indexes = [
+            # История в профиле пользователя
+            models.Index(
+                fields=['user', '-created_at'],
+                name='reservation_user_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Бронь: {self.name} - {self.animal.name} ({self.visit_date})"
@@ -301,6 +471,12 @@ class SupportRequest(models.Model):
         verbose_name='Дата обновления'
     )
 
+    search_document = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Поисковый текст'
+    )
+
     class Meta:
         verbose_name = 'Обращение в поддержку'
         verbose_name_plural = 'Обращения в поддержку'
@@ -355,10 +531,23 @@ class Adoption(models.Model):
         verbose_name='Дата обновления'
     )
 
+    search_document = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Поисковый текст'
+    )
+
     class Meta:
         verbose_name = 'Усыновление'
         verbose_name_plural = 'Усыновления'
         ordering = ['-created_at']
+        indexes = [
+            # История в профиле пользователя
+            models.Index(
+                fields=['user', '-created_at'],
+                name='adoption_user_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name()} усыновляет {self.animal.name}"
@@ -423,11 +612,151 @@ class Donation(models.Model):
         verbose_name='Дата обновления'
     )
 
+    search_document = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Поисковый текст'
+    )
+
     class Meta:
         verbose_name = 'Пожертвование'
         verbose_name_plural = 'Пожертвования'
         ordering = ['-created_at']
+        indexes = [
+            # История в профиле пользователя
+            models.Index(
+                fields=['user', '-created_at'],
+                name='donation_user_created_idx'
+            ),
+        ]
 
     def __str__(self):
         donor = self.name or self.user.get_full_name() if self.user else 'Аноним'
         return f"{donor} - {self.amount} руб."
+
+
+class DonorTotal(models.Model):
+    """Сумма оплаченных неанонимных пожертвований пользователя (рейтинг доноров)"""
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='donor_total',
+        verbose_name='Пользователь'
+    )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Сумма'
+    )
+    donations = models.IntegerField(
+        default=0,
+        verbose_name='Количество пожертвований'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Итог донора'
+        verbose_name_plural = 'Рейтинг доноров'
+        indexes = [
+            # Топ доноров читается по убыванию суммы
+            models.Index(
+                fields=['-total', 'user'],
+                name='donor_total_rank_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.total} руб."
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди (см. jobs.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    task = models.CharField(
+        max_length=100,
+        verbose_name='Задача'
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Параметры'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveIntegerField(
+        default=5,
+        verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить не раньше'
+    )
+    locked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Взята в работу'
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Воркер'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-created_at']
+        indexes = [
+            # Воркеры выбирают задачи из очереди по времени запуска
+            models.Index(
+                fields=['run_at'],
+                name='job_pending_run_at_idx',
+                condition=Q(status='pending')
+            ),
+            # Поиск задач зависших воркеров
+            models.Index(
+                fields=['locked_at'],
+                name='job_running_locked_idx',
+                condition=Q(status='running')
+            ),
+            # Удаление старых выполненных задач
+            models.Index(
+                fields=['updated_at'],
+                name='job_done_updated_idx',
+                condition=Q(status='done')
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
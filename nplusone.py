@@ -0,0 +1,215 @@
+"""
+Поиск запросов N+1 в разработке и проверках.
+
+Детектор смотрит SQL, выполненный за запрос (или внутри
+detect_n_plus_one()), и группирует SELECT по форме — тексту с
+плейсхолдерами, где списки IN (...) любой длины совпадают. Форма,
+повторенная SHELTER_NPLUSONE_THRESHOLD раз и больше, — признак ленивой
+загрузки в цикле. В отчете: модель, место в коде (и шаблоне), откуда
+пошел повторный запрос, и подсказка — select_related, prefetch_related
+или поле, отложенное через only()/defer().
+
+SHELTER_NPLUSONE = 'warn' пишет отчет в лог shelter.nplusone, 'raise'
+поднимает NPlusOneError. Без настройки NPlusOneMiddleware исключает себя
+из цепочки при запуске (MiddlewareNotUsed) и ничего не стоит.
+"""
+import logging
+import os
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor, ReverseOneToOneDescriptor
+)
+from django.db.models.query import QuerySet
+from django.db.models.query_utils import DeferredAttribute
+from django.template.base import Node
+
+
+logger = logging.getLogger('shelter.nplusone')
+
+IN_LIST = re.compile(r'\((?:%s, )*%s\)')
+FROM_TABLE = re.compile(r'\bFROM\s+"?(\w+)"?', re.IGNORECASE)
+# Список столбцов в отчете не нужен, важны таблица и условие
+SELECT_COLUMNS = re.compile(r'^SELECT\s.+?\sFROM\s', re.DOTALL)
+
+# Кадры этих каталогов не считаются местом в коде проекта
+LIBRARY_DIRS = tuple(
+    os.path.dirname(path) + os.sep
+    for path in (django.__file__, os.__file__)
+)
+
+
+class NPlusOneError(Exception):
+    """Найдены повторяющиеся запросы"""
+
+
+def threshold_setting():
+    return getattr(settings, 'SHELTER_NPLUSONE_THRESHOLD', 3)
+
+
+def query_shape(sql):
+    return IN_LIST.sub('(%s...)', sql)
+
+
+def table_model(sql):
+    match = FROM_TABLE.search(sql)
+    if match is None:
+        return None
+    for model in apps.get_models():
+        if model._meta.db_table == match.group(1):
+            return model
+    return None
+
+
+def is_project_file(filename):
+    return (
+        filename != __file__
+        and not filename.startswith(LIBRARY_DIRS)
+        and 'site-packages' not in filename
+        and 'dist-packages' not in filename
+        and not filename.startswith('<')
+    )
+
+
+def relation_hint(frame):
+    """Подсказка по кадру ленивой загрузки связи или отложенного поля"""
+    owner = frame.f_locals.get('self')
+    if frame.f_code.co_name == '__get__':
+        instance = frame.f_locals.get('instance')
+        model = type(instance).__name__
+        if isinstance(owner, ForwardManyToOneDescriptor):
+            return f"{model}: .select_related('{owner.field.name}')"
+        if isinstance(owner, ReverseOneToOneDescriptor):
+            return f"{model}: .select_related('{owner.related.get_accessor_name()}')"
+        if isinstance(owner, DeferredAttribute):
+            return f"{model}: поле '{owner.field.attname}' отложено через only()/defer() — загрузите его сразу"
+    if isinstance(owner, QuerySet) and owner._known_related_objects:
+        # Так помечает queryset менеджер обратной связи (animal.reservations.all())
+        field = next(iter(owner._known_related_objects))
+        return f"{field.related_model.__name__}: .prefetch_related('{field.remote_field.get_accessor_name()}')"
+    return None
+
+
+def template_position(frame):
+    node = frame.f_locals.get('self')
+    if isinstance(node, Node) and getattr(node, 'token', None) and getattr(node, 'origin', None):
+        return f'{node.origin.template_name or node.origin.name}:{node.token.lineno}'
+    return None
+
+
+def inspect_stack(frame):
+    """(место в коде проекта, место в шаблоне, подсказка) для текущего запроса"""
+    site = template = hint = None
+    while frame is not None:
+        if hint is None:
+            hint = relation_hint(frame)
+        if template is None:
+            template = template_position(frame)
+        filename = frame.f_code.co_filename
+        if site is None and is_project_file(filename):
+            site = f'{os.path.relpath(filename)}:{frame.f_lineno} в {frame.f_code.co_name}'
+        if site and template and hint:
+            break
+        frame = frame.f_back
+    return site, template, hint
+
+
+class QueryShape:
+    """Одинаковые по форме запросы"""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.site = self.template = self.hint = None
+
+    @property
+    def model(self):
+        return table_model(self.sql)
+
+    def report(self):
+        model = self.model
+        lines = [
+            f'{self.count} одинаковых запросов к '
+            f'{model._meta.label if model else "таблице"}'
+        ]
+        if self.site or self.template:
+            lines.append('  место: ' + ', шаблон '.join(filter(None, [self.site, self.template])))
+        if self.hint:
+            lines.append(f'  подсказка: {self.hint}')
+        lines.append(f"  SQL: {SELECT_COLUMNS.sub('SELECT ... FROM ', self.sql, count=1)}")
+        return '\n'.join(lines)
+
+
+class NPlusOneDetector:
+    """execute_wrapper, который считает SELECT по формам"""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or threshold_setting()
+        self.shapes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            shape = query_shape(sql)
+            entry = self.shapes.get(shape)
+            if entry is None:
+                entry = self.shapes[shape] = QueryShape(sql)
+            entry.count += 1
+            # Первый повтор показывает, откуда идет цикл
+            if entry.count == 2:
+                entry.site, entry.template, entry.hint = inspect_stack(sys._getframe(1))
+        return execute(sql, params, many, context)
+
+    def findings(self):
+        return [
+            shape for shape in self.shapes.values() if shape.count >= self.threshold
+        ]
+
+    def report(self, label=''):
+        findings = self.findings()
+        if not findings:
+            return ''
+        header = f'N+1 {label}'.strip() + ':'
+        return '\n'.join([header] + [shape.report() for shape in findings])
+
+
+@contextmanager
+def detect_n_plus_one(action=None, threshold=None, label=''):
+    """
+    Следить за запросами всех баз внутри блока.
+
+    action: 'warn', 'raise' или None (только собрать — detector.findings()).
+    """
+    detector = NPlusOneDetector(threshold)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(detector))
+        yield detector
+
+    message = detector.report(label)
+    if not message:
+        return
+    if action == 'raise':
+        raise NPlusOneError(message)
+    if action == 'warn':
+        logger.warning(message)
+
+
+class NPlusOneMiddleware:
+    """Проверка каждого запроса на N+1 при SHELTER_NPLUSONE = 'warn' или 'raise'"""
+
+    def __init__(self, get_response):
+        self.action = getattr(settings, 'SHELTER_NPLUSONE', None)
+        if self.action not in ('warn', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect_n_plus_one(self.action, label=f'{request.method} {request.path}'):
+            return self.get_response(request)
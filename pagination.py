@@ -0,0 +1,213 @@
+"""
+Пагинация без COUNT(*).
+
+CursorPaginator — курсорная (keyset) пагинация по (created_at, id): не выполняет
+COUNT(*) и не использует OFFSET, поэтому любая страница открывается за одно и то же время.
+
+UncountedPaginator — совместимая с django.core.paginator.Paginator пагинация
+по номерам страниц без подсчета общего количества записей.
+
+EstimatedCountPaginator — пагинация по номерам страниц для больших таблиц:
+вместо точного COUNT(*) использует оценку планировщика или ограниченный подсчет.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj, direction):
+    """Курсор указывает на запись obj и направление движения ('next' или 'prev')"""
+    payload = json.dumps([direction, obj.created_at.isoformat(), obj.pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if direction not in ('next', 'prev') or created_at is None:
+        raise InvalidCursor(cursor)
+    return direction, created_at, pk
+
+
+class CursorPage:
+    """Страница курсорной пагинации (интерфейс близок к django.core.paginator.Page)"""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], 'next')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], 'prev')
+        return None
+
+
+class CursorPaginator:
+    """Пагинация от новых к старым по (-created_at, -id)"""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by('-created_at', '-pk')
+        self.per_page = per_page
+
+    def get_page(self, cursor):
+        """Вернуть страницу по курсору; пустой или некорректный курсор — первая страница"""
+        try:
+            direction, created_at, pk = decode_cursor(cursor) if cursor else (None, None, None)
+        except InvalidCursor:
+            direction = None
+
+        if direction is None:
+            rows = list(self.queryset[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], len(rows) > self.per_page, False)
+
+        if direction == 'next':
+            # Записи старше курсора
+            rows = list(self.queryset.filter(
+                Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(pk__lt=pk))
+            )[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], len(rows) > self.per_page, True)
+
+        # Записи новее курсора: выбираем в обратном порядке и разворачиваем
+        rows = list(self.queryset.filter(
+            Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(pk__gt=pk))
+        ).order_by('created_at', 'pk')[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, True, has_previous)
+
+
+class UncountedPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class UncountedPaginator(Paginator):
+    """Пагинатор без COUNT(*): наличие следующей страницы определяется по лишней строке"""
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На этой странице нет результатов')
+        return UncountedPage(rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+
+class EstimatedCount(int):
+    """Неточное количество записей: в шаблонах выводится подписью («≈ 120000», «более 10000»)"""
+
+    def __new__(cls, value, label):
+        count = super().__new__(cls, value)
+        count.label = label
+        return count
+
+    def __str__(self):
+        return self.label
+
+    def __html__(self):
+        return self.label
+
+
+def estimate_table_rows(model, using='default'):
+    """Оценка числа строк таблицы по статистике PostgreSQL (None, если оценки нет)"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    # reltuples = -1 (или 0), пока таблица ни разу не анализировалась
+    if row is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших, постоянно растущих таблиц.
+
+    Без фильтров: если оценка планировщика (pg_class.reltuples) не меньше
+    порога, используется она, иначе точный COUNT(*).
+    С фильтрами: считается не больше threshold + 1 строк; если строк больше,
+    количество показывается как «более threshold».
+    """
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, threshold=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        if threshold is None:
+            threshold = getattr(settings, 'SHELTER_ADMIN_COUNT_THRESHOLD', 10000)
+        self.threshold = threshold
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        if not queryset.query.has_filters():
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.threshold:
+                return EstimatedCount(estimate, f'≈ {estimate}')
+            return queryset.count()
+
+        # Порядок и вычисляемые колонки для подсчета не нужны
+        bounded = queryset.order_by().values('pk')[:self.threshold + 1].count()
+        if bounded > self.threshold:
+            return EstimatedCount(bounded, f'более {self.threshold}')
+        return bounded
@@ -0,0 +1,272 @@
+"""
+Профилирование отдельных запросов в продакшне.
+
+Сотрудник получает на странице /staff/profiles/ подписанный токен и
+передает его в заголовке X-Shelter-Profile или параметре ?_profile=.
+Такой запрос проходит через ProfilingMiddleware под профилировщиком:
+
+- sampling — поток раз в SHELTER_PROFILE_INTERVAL секунд снимает стек
+  потока запроса; результат в формате collapsed stacks (flamegraph.pl,
+  speedscope);
+- cprofile — cProfile, файл pstats (snakeviz, gprof2dot, pstats).
+
+Файлы складываются в SHELTER_PROFILE_DIR, хранятся последние
+SHELTER_PROFILE_KEEP профилей (кольцевой буфер). Идентификатор профиля
+возвращается в заголовке ответа X-Shelter-Profile-Id.
+
+Без SHELTER_PROFILE_DIR middleware исключает себя из цепочки
+(MiddlewareNotUsed); остальные запросы проверяются только на наличие
+заголовка и подстроки в строке запроса.
+"""
+import cProfile
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+
+PROFILE_HEADER = 'HTTP_X_SHELTER_PROFILE'
+PROFILE_PARAM = '_profile'
+PROFILE_ID_HEADER = 'X-Shelter-Profile-Id'
+SIGNING_SALT = 'shelter.profiling'
+
+# Режим -> (расширение файла, описание)
+MODES = {
+    'sampling': ('.collapsed', 'сэмплирование, collapsed stacks'),
+    'cprofile': ('.prof', 'cProfile, pstats'),
+}
+
+PROFILE_ID = re.compile(r'^\d{20}-\d+$')
+
+
+def profile_dir():
+    return getattr(settings, 'SHELTER_PROFILE_DIR', None)
+
+
+def profile_keep():
+    return getattr(settings, 'SHELTER_PROFILE_KEEP', 50)
+
+
+def token_max_age():
+    return getattr(settings, 'SHELTER_PROFILE_TOKEN_AGE', 3600)
+
+
+def sampling_interval():
+    return getattr(settings, 'SHELTER_PROFILE_INTERVAL', 0.001)
+
+
+def make_token(user, mode):
+    """Токен включения профилирования, действует SHELTER_PROFILE_TOKEN_AGE секунд"""
+    return signing.dumps({'m': mode, 'u': user.pk}, salt=SIGNING_SALT)
+
+
+def read_token(token):
+    """(режим, pk сотрудника) или None для неверного или просроченного токена"""
+    try:
+        payload = signing.loads(token, salt=SIGNING_SALT, max_age=token_max_age())
+    except signing.BadSignature:
+        return None
+    if payload.get('m') not in MODES:
+        return None
+    return payload['m'], payload.get('u')
+
+
+def requested_token(request):
+    """Токен из заголовка или строки запроса; None, если профилирование не запрошено"""
+    token = request.META.get(PROFILE_HEADER)
+    if token:
+        return token
+    # request.GET не трогаем: QueryDict разбирается только для запросов с параметром
+    if PROFILE_PARAM + '=' in request.META.get('QUERY_STRING', ''):
+        return request.GET.get(PROFILE_PARAM)
+    return None
+
+
+def frame_label(code):
+    # co_qualname появился в Python 3.11
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """Поток, который снимает стек одного потока и считает одинаковые стеки"""
+
+    def __init__(self, thread_id, root_code, interval):
+        self.thread_id = thread_id
+        # Кадры выше кадра с этим кодом (сервер, обработчик WSGI) не пишутся
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, name='shelter-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def run(self):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame.f_code is not self.root_code:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as fp:
+            for stack, count in self.stacks.most_common():
+                fp.write(f'{stack} {count}\n')
+
+
+def new_profile_id():
+    return f'{time.time_ns():020d}-{os.getpid()}'
+
+
+def meta_file(directory, profile_id):
+    return os.path.join(directory, f'{profile_id}.json')
+
+
+def data_path(directory, profile_id, mode):
+    return os.path.join(directory, profile_id + MODES[mode][0])
+
+
+def save_profile(directory, profile_id, meta, write_data):
+    """Записать данные и описание профиля (описание последним) и удалить старые профили"""
+    os.makedirs(directory, exist_ok=True)
+    path = data_path(directory, profile_id, meta['mode'])
+    # Данные через временный файл: описание без данных список не покажет
+    write_data(f'{path}.tmp')
+    os.replace(f'{path}.tmp', path)
+    meta['size'] = os.path.getsize(path)
+
+    meta_path = meta_file(directory, profile_id)
+    with open(f'{meta_path}.tmp', 'w', encoding='utf-8') as fp:
+        json.dump(meta, fp, ensure_ascii=False)
+    os.replace(f'{meta_path}.tmp', meta_path)
+    prune_profiles(directory, profile_keep())
+
+
+def prune_profiles(directory, keep):
+    """Оставить keep последних профилей; идентификаторы начинаются со времени, так что сортируются по нему"""
+    paths = sorted(glob.glob(os.path.join(directory, '*.json')))
+    for meta_path in paths[:max(0, len(paths) - keep)]:
+        profile_id = os.path.basename(meta_path)[:-len('.json')]
+        for suffix, _ in MODES.values():
+            remove_file(os.path.join(directory, profile_id + suffix))
+        remove_file(meta_path)
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        # Удалил другой воркер
+        pass
+
+
+def list_profiles():
+    """Описания сохраненных профилей, новые первыми"""
+    directory = profile_dir()
+    if not directory:
+        return []
+    profiles = []
+    for meta_path in sorted(glob.glob(os.path.join(directory, '*.json')), reverse=True):
+        try:
+            with open(meta_path, encoding='utf-8') as fp:
+                profiles.append(json.load(fp))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def open_profile(profile_id):
+    """(файл данных, описание) профиля или None"""
+    directory = profile_dir()
+    if not directory or not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(meta_file(directory, profile_id), encoding='utf-8') as fp:
+            meta = json.load(fp)
+        return open(data_path(directory, profile_id, meta['mode']), 'rb'), meta
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запросов с токеном из /staff/profiles/. Ставится сразу
+    после MetricsMiddleware, чтобы в профиль попали остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.directory = profile_dir()
+        if not self.directory:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = requested_token(request)
+        if token is None:
+            return self.get_response(request)
+        granted = read_token(token)
+        if granted is None:
+            return self.get_response(request)
+        return self.profile(request, *granted)
+
+    def profile(self, request, mode, staff_id):
+        profile_id = new_profile_id()
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            write_data = profiler.dump_stats
+            samples = None
+        else:
+            profiler = StackSampler(threading.get_ident(), sys._getframe().f_code, sampling_interval())
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            write_data = profiler.dump
+            samples = sum(profiler.stacks.values())
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        save_profile(self.directory, profile_id, {
+            'id': profile_id,
+            'mode': mode,
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'samples': samples,
+            'staff_id': staff_id,
+            'created': timezone.now().isoformat(),
+        }, write_data)
+        response[PROFILE_ID_HEADER] = profile_id
+        return response
@@ -0,0 +1,299 @@
+"""
+Похожие животные для страницы животного (таблица SimilarAnimal).
+
+Каждое животное кодируется вектором признаков: тип и пол — one-hot,
+возраст и размер — порядковые значения, порода — хеш в одну из
+BREED_BUCKETS позиций. Веса признаков задают, насколько различие в нем
+увеличивает расстояние. Ближайшие доступные животные ищутся NumPy
+пачками (евклидово расстояние через матричное произведение) и
+сохраняются по SHELTER_SIMILAR_ANIMALS на животное, так что
+представление только читает готовый список по индексу.
+
+Изменения применяются точечно задачей update_similar_animals: пересчитываются
+списки самих измененных животных, списки, в которых они уже есть, и списки,
+в которые они теперь попадают ближе текущего последнего соседа.
+При равных расстояниях порядок после точечного обновления может отличаться
+от полного пересчета (manage.py rebuild_similar_animals).
+
+Матрица признаков всех животных хранится в процессе воркера (VectorCache):
+задача перечитывает из базы только измененных животных, а целиком таблица
+загружается раз в SHELTER_SIMILAR_CACHE_TTL секунд — так изменения,
+обработанные другими воркерами, тоже попадают в кеш. Сам пересчет
+остается O(N) на измененное животное, но это операции NumPy над готовой
+матрицей, а не чтение и кодирование всей таблицы.
+"""
+import time
+import zlib
+
+import numpy as np
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Animal, SimilarAnimal
+
+
+FEATURE_FIELDS = ['animal_type', 'age', 'gender', 'size', 'breed']
+
+WEIGHTS = {
+    'animal_type': 2.0,
+    'age': 1.5,
+    'size': 1.5,
+    'gender': 0.5,
+    'breed': 1.0,
+}
+
+BREED_BUCKETS = 64
+
+TYPE_INDEX = {value: i for i, (value, _) in enumerate(Animal.ANIMAL_TYPES)}
+GENDER_INDEX = {value: i for i, (value, _) in enumerate(Animal.GENDER_CHOICES)}
+# Порядковые признаки приводятся к [0, 1]
+AGE_VALUE = {value: i / (len(Animal.AGE_CHOICES) - 1) for i, (value, _) in enumerate(Animal.AGE_CHOICES)}
+SIZE_VALUE = {value: i / (len(Animal.SIZE_CHOICES) - 1) for i, (value, _) in enumerate(Animal.SIZE_CHOICES)}
+
+TYPE_OFFSET = 0
+GENDER_OFFSET = TYPE_OFFSET + len(TYPE_INDEX)
+AGE_OFFSET = GENDER_OFFSET + len(GENDER_INDEX)
+SIZE_OFFSET = AGE_OFFSET + 1
+BREED_OFFSET = SIZE_OFFSET + 1
+DIMENSIONS = BREED_OFFSET + BREED_BUCKETS
+
+# Ограничение на размер матрицы расстояний одной пачки (элементов float32)
+CHUNK_CELLS = 4_000_000
+
+# Строк в одном INSERT (4 параметра на строку, в SQLite до 32766 параметров)
+INSERT_BATCH = 1000
+
+
+def neighbor_count():
+    return getattr(settings, 'SHELTER_SIMILAR_ANIMALS', 8)
+
+
+def breed_bucket(breed):
+    breed = ' '.join((breed or '').lower().split())
+    if not breed:
+        return None
+    return zlib.crc32(breed.encode()) % BREED_BUCKETS
+
+
+def encode_animals(rows):
+    """Матрица признаков (float32) для строк (animal_type, age, gender, size, breed)"""
+    matrix = np.zeros((len(rows), DIMENSIONS), dtype=np.float32)
+    for i, (animal_type, age, gender, size, breed) in enumerate(rows):
+        if animal_type in TYPE_INDEX:
+            matrix[i, TYPE_OFFSET + TYPE_INDEX[animal_type]] = WEIGHTS['animal_type']
+        if gender in GENDER_INDEX:
+            matrix[i, GENDER_OFFSET + GENDER_INDEX[gender]] = WEIGHTS['gender']
+        matrix[i, AGE_OFFSET] = AGE_VALUE.get(age, 0.5) * WEIGHTS['age']
+        matrix[i, SIZE_OFFSET] = SIZE_VALUE.get(size, 0.5) * WEIGHTS['size']
+        bucket = breed_bucket(breed)
+        if bucket is not None:
+            matrix[i, BREED_OFFSET + bucket] = WEIGHTS['breed']
+    return matrix
+
+
+def load_vectors():
+    """(ids, матрица признаков, маска доступных) по всем животным в порядке pk"""
+    rows = list(Animal.objects.order_by('pk').values_list('pk', 'status', *FEATURE_FIELDS))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    available = np.array([row[1] == 'available' for row in rows], dtype=bool)
+    return ids, encode_animals([row[2:] for row in rows]), available
+
+
+def cache_ttl():
+    return getattr(settings, 'SHELTER_SIMILAR_CACHE_TTL', 300)
+
+
+class VectorCache:
+    """Векторы load_vectors() в памяти процесса; обновляются по измененным животным"""
+
+    def __init__(self):
+        self.vectors = None
+        self.loaded_at = 0.0
+
+    def set(self, vectors):
+        self.vectors = vectors
+        self.loaded_at = time.monotonic()
+
+    def get(self, changed_ids=()):
+        """(ids, матрица, маска доступных) с актуальными строками changed_ids"""
+        if self.vectors is None or time.monotonic() - self.loaded_at >= cache_ttl():
+            self.set(load_vectors())
+        elif len(changed_ids):
+            self.vectors = self.patched(changed_ids)
+        return self.vectors
+
+    def patched(self, changed_ids):
+        ids, matrix, available = self.vectors
+        rows = list(Animal.objects.filter(pk__in=list(changed_ids)).order_by('pk').values_list(
+            'pk', 'status', *FEATURE_FIELDS
+        ))
+        # Измененные строки убираются и добавляются заново (удаленных в выборке нет)
+        keep = ~np.isin(ids, np.array(list(changed_ids), dtype=np.int64))
+        ids = np.concatenate([ids[keep], np.array([row[0] for row in rows], dtype=np.int64)])
+        matrix = np.concatenate([matrix[keep], encode_animals([row[2:] for row in rows])])
+        available = np.concatenate([available[keep], np.array([row[1] == 'available' for row in rows], dtype=bool)])
+        order = np.argsort(ids, kind='stable')
+        return ids[order], matrix[order], available[order]
+
+
+vector_cache = VectorCache()
+
+
+def squared_distances(query, candidates, candidate_norms=None):
+    """Квадраты расстояний между строками query и candidates (округлены, чтобы равные были равны)"""
+    if candidate_norms is None:
+        candidate_norms = np.einsum('ij,ij->i', candidates, candidates)
+    distances = np.einsum('ij,ij->i', query, query)[:, None] + candidate_norms[None, :]
+    distances -= 2 * query @ candidates.T
+    np.maximum(distances, 0, out=distances)
+    return np.round(distances, 4)
+
+
+def nearest_neighbors(query_ids, query, candidate_ids, candidates, k):
+    """
+    Для каждой строки query — до k ближайших кандидатов, кроме самого животного.
+
+    Возвращает генератор (query_id, [(neighbor_id, distance), ...]).
+    Признаки дискретны, поэтому соседи ищутся один раз для каждого
+    уникального вектора, а матрица расстояний считается пачками не больше
+    CHUNK_CELLS элементов.
+    """
+    if not len(candidate_ids):
+        for query_id in query_ids:
+            yield int(query_id), []
+        return
+
+    profiles, inverse = np.unique(query, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    candidate_norms = np.einsum('ij,ij->i', candidates, candidates)
+    # Лишний сосед на случай, если среди кандидатов есть само животное
+    kk = min(k + 1, len(candidate_ids))
+    chunk = max(1, CHUNK_CELLS // len(candidate_ids))
+    top_ids = np.empty((len(profiles), kk), dtype=candidate_ids.dtype)
+    top_distances = np.empty((len(profiles), kk), dtype=np.float32)
+    for start in range(0, len(profiles), chunk):
+        distances = squared_distances(profiles[start:start + chunk], candidates, candidate_norms)
+        if kk < len(candidate_ids):
+            top = np.argpartition(distances, kk - 1, axis=1)[:, :kk]
+        else:
+            top = np.broadcast_to(np.arange(len(candidate_ids)), (len(distances), kk))
+        part_distances = np.take_along_axis(distances, top, axis=1)
+        part_ids = candidate_ids[top]
+        # По расстоянию, при равенстве — по pk
+        order = np.lexsort((part_ids, part_distances), axis=1)
+        top_ids[start:start + chunk] = np.take_along_axis(part_ids, order, axis=1)
+        top_distances[start:start + chunk] = np.take_along_axis(part_distances, order, axis=1)
+
+    neighbors = [
+        list(zip(row_ids.tolist(), row_distances.tolist()))
+        for row_ids, row_distances in zip(top_ids, top_distances)
+    ]
+    for query_id, profile in zip(query_ids.tolist(), inverse.tolist()):
+        yield query_id, [pair for pair in neighbors[profile] if pair[0] != query_id][:k]
+
+
+def insert_rows(cursor, rows):
+    """INSERT пачками по INSERT_BATCH строк: bulk_create тратит на подготовку каждой строки больше, чем база"""
+    table = SimilarAnimal._meta.db_table
+    for start in range(0, len(rows), INSERT_BATCH):
+        batch = rows[start:start + INSERT_BATCH]
+        cursor.execute(
+            f'INSERT INTO {table} (animal_id, neighbor_id, rank, distance) VALUES '
+            + ', '.join(['(%s, %s, %s, %s)'] * len(batch)),
+            [value for row in batch for value in row]
+        )
+
+
+def save_neighbors(neighbors, replace_ids=None):
+    """Записать списки соседей; replace_ids — чьи списки удалить (None — все)"""
+    with transaction.atomic():
+        if replace_ids is None:
+            SimilarAnimal.objects.all().delete()
+        else:
+            # Блокировка животных упорядочивает одновременные пересчеты одних списков
+            list(Animal.objects.filter(pk__in=replace_ids).order_by('pk').select_for_update().values_list('pk'))
+            SimilarAnimal.objects.filter(animal_id__in=replace_ids).delete()
+
+        rows = [
+            (animal_id, neighbor_id, rank, distance)
+            for animal_id, pairs in neighbors
+            for rank, (neighbor_id, distance) in enumerate(pairs)
+        ]
+        with connection.cursor() as cursor:
+            insert_rows(cursor, rows)
+        return len(rows)
+
+
+def rebuild_similar_animals():
+    """Пересчитать списки похожих для всех животных; возвращает число записей"""
+    ids, matrix, available = load_vectors()
+    vector_cache.set((ids, matrix, available))
+    neighbors = list(nearest_neighbors(ids, matrix, ids[available], matrix[available], neighbor_count()))
+    return save_neighbors(neighbors)
+
+
+def refresh_similar_animals(animal_ids, affected_ids=()):
+    """
+    Пересчитать списки, на которые влияют добавленные, удаленные или
+    измененные животные animal_ids, и списки животных affected_ids.
+    Возвращает число пересчитанных списков.
+    """
+    animal_ids = np.array(animal_ids, dtype=np.int64)
+    if not len(animal_ids) and not affected_ids:
+        return 0
+    ids, matrix, available = vector_cache.get(animal_ids.tolist())
+    k = neighbor_count()
+
+    position = np.searchsorted(ids, animal_ids)
+    found = position < len(ids)
+    found[found] = ids[position[found]] == animal_ids[found]
+    changed = position[found]
+
+    targets = set(ids[changed].tolist()) | set(affected_ids)
+    # Списки, в которых измененные животные уже есть
+    targets.update(SimilarAnimal.objects.filter(
+        neighbor_id__in=animal_ids.tolist()
+    ).values_list('animal_id', flat=True))
+
+    # Списки, в которые доступные измененные животные попадают
+    entering = changed[available[changed]]
+    if len(entering):
+        # У заполненного списка последний сосед (rank k - 1) — самый дальний;
+        # у неполных списков порог бесконечный
+        worst = np.full(len(ids), np.inf, dtype=np.float32)
+        filled = list(SimilarAnimal.objects.filter(rank=k - 1).values_list('animal_id', 'distance'))
+        if filled:
+            list_ids = np.fromiter((row[0] for row in filled), dtype=np.int64, count=len(filled))
+            list_worst = np.fromiter((row[1] for row in filled), dtype=np.float32, count=len(filled))
+            index = np.searchsorted(ids, list_ids)
+            known = index < len(ids)
+            known[known] = ids[index[known]] == list_ids[known]
+            worst[index[known]] = list_worst[known]
+        norms = np.einsum('ij,ij->i', matrix, matrix)
+        chunk = max(1, CHUNK_CELLS // len(ids))
+        for start in range(0, len(entering), chunk):
+            columns = entering[start:start + chunk]
+            distances = squared_distances(matrix[columns], matrix, norms)
+            distances[ids[columns][:, None] == ids[None, :]] = np.inf
+            targets.update(ids[(distances < worst[None, :]).any(axis=0)].tolist())
+
+    if not targets:
+        return 0
+    target_ids = np.array(sorted(targets), dtype=np.int64)
+    target_positions = np.searchsorted(ids, target_ids)
+    exists = target_positions < len(ids)
+    exists[exists] = ids[target_positions[exists]] == target_ids[exists]
+    neighbors = list(nearest_neighbors(
+        target_ids[exists], matrix[target_positions[exists]],
+        ids[available], matrix[available], k
+    ))
+    save_neighbors(neighbors, replace_ids=target_ids.tolist())
+    return len(neighbors)
+
+
+def get_similar_animals(animal, limit=4):
+    """Похожие доступные животные из предрасчитанного списка (один запрос по индексу)"""
+    return Animal.objects.filter(
+        recommended_for__animal=animal, status='available'
+    ).order_by('recommended_for__rank')[:limit]
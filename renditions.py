@@ -0,0 +1,127 @@
+"""
+Превью загруженных изображений (Animal.photo, CustomUser.avatar).
+
+Для каждого изображения создаются уменьшенные копии фиксированных
+размеров в WebP и JPEG. Они сохраняются рядом с оригиналом
+(animals/rex.jpg -> animals/rex.card.webp, animals/rex.card.jpg),
+а их имена записываются в JSON-поле модели <поле>_renditions.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+# Название: (размер, обрезать ли до точного размера)
+RENDITIONS = {
+    'card': ((600, 450), True),
+    'detail': ((1200, 900), False),
+    'admin': ((200, 200), False),
+    'avatar': ((160, 160), True),
+}
+
+# Какие превью нужны для каждого поля с изображением
+FIELD_RENDITIONS = {
+    'photo': ('card', 'detail', 'admin'),
+    'avatar': ('avatar',),
+}
+
+# Формат: (расширение, формат Pillow, параметры сохранения)
+FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def renditions_field(field_name):
+    return f'{field_name}_renditions'
+
+
+def render_renditions(storage, name, renditions):
+    """
+    Создать превью для файла name в хранилище storage.
+
+    Возвращает {превью: {формат: имя файла}}. Не обращается к базе данных,
+    поэтому может выполняться в отдельном процессе.
+    """
+    with storage.open(name, 'rb') as fp:
+        image = Image.open(fp)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    base = os.path.splitext(name)[0]
+    result = {}
+    for rendition in renditions:
+        size, crop = RENDITIONS[rendition]
+        if crop:
+            thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+        else:
+            thumbnail = image.copy()
+            thumbnail.thumbnail(size, Image.LANCZOS)
+
+        result[rendition] = {}
+        for fmt, (extension, pillow_format, options) in FORMATS.items():
+            buffer = BytesIO()
+            thumbnail.save(buffer, format=pillow_format, **options)
+            target = f'{base}.{rendition}.{extension}'
+            if storage.exists(target):
+                storage.delete(target)
+            result[rendition][fmt] = storage.save(target, ContentFile(buffer.getvalue()))
+    return result
+
+
+def delete_renditions(storage, renditions, keep=None):
+    """Удалить файлы превью, кроме перечисленных в keep"""
+    keep = {
+        name for formats in (keep or {}).values() for name in formats.values()
+    }
+    for formats in (renditions or {}).values():
+        for name in formats.values():
+            if name not in keep:
+                storage.delete(name)
+
+
+def update_renditions(instance, field_name):
+    """Пересоздать превью для изображения экземпляра модели и сохранить их имена"""
+    field_file = getattr(instance, field_name)
+    storage = field_file.storage
+    previous = getattr(instance, renditions_field(field_name)) or {}
+
+    renditions = {}
+    if field_file:
+        try:
+            renditions = render_renditions(storage, field_file.name, FIELD_RENDITIONS[field_name])
+        except (OSError, Image.DecompressionBombError):
+            logger.exception('Не удалось создать превью для %s', field_file.name)
+
+    delete_renditions(storage, previous, keep=renditions)
+    type(instance)._default_manager.filter(pk=instance.pk).update(
+        **{renditions_field(field_name): renditions}
+    )
+    setattr(instance, renditions_field(field_name), renditions)
+    return renditions
+
+
+def rendition_urls(field_file, renditions, names):
+    """
+    URL превью: {превью: {формат: url}}.
+
+    Пока превью не созданы, вместо них отдается оригинал.
+    """
+    if not field_file:
+        return {}
+    original = field_file.url
+    return {
+        name: {
+            fmt: field_file.storage.url(renditions[name][fmt])
+            if name in (renditions or {}) and fmt in renditions[name] else original
+            for fmt in FORMATS
+        }
+        for name in names
+    }
@@ -352,6 +352,134 @@ function sendAjaxRequest(url, data, method = 'POST') {
     });
 }
 
+// Показать статус животного на карточке
+function applyAnimalStatus(card, status, label) {
+    const badge = card.querySelector('.animal-badge');
+    if (badge) {
+        badge.textContent = label;
+    }
+    const button = card.querySelector('.btn-reserve');
+    if (button) {
+        button.disabled = status !== 'available';
+    }
+    card.classList.toggle('unavailable', status !== 'available');
+}
+
+function animalCardIds(container) {
+    const ids = Array.from(container.querySelectorAll('[data-animal-id]'), card => Number(card.dataset.animalId));
+    return [...new Set(ids)].sort((a, b) => a - b);
+}
+
+// Актуальные статусы всех карточек на странице одним запросом.
+// Контейнер: <div data-availability-url="{% url 'api_check_availability_batch' %}">,
+// карточки внутри: <div class="animal-card" data-animal-id="{{ animal.id }}">
+function refreshAvailability(container) {
+    const cards = Array.from(container.querySelectorAll('[data-animal-id]'));
+    const ids = animalCardIds(container);
+    if (!ids.length) {
+        return Promise.resolve();
+    }
+
+    const url = new URL(container.dataset.availabilityUrl, window.location.origin);
+    url.searchParams.set('ids', ids.join(','));
+
+    return fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            cards.forEach(card => {
+                const status = data.statuses[card.dataset.animalId];
+                if (status) {
+                    applyAnimalStatus(card, status, data.labels[status]);
+                }
+            });
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+// Живые обновления статусов через server-sent events.
+// Контейнер: <div data-status-stream-url="{% url 'api_animal_status_stream' %}">
+function subscribeToStatusUpdates(container) {
+    const ids = animalCardIds(container);
+    if (!ids.length || !window.EventSource) {
+        return null;
+    }
+
+    const url = new URL(container.dataset.statusStreamUrl, window.location.origin);
+    url.searchParams.set('ids', ids.join(','));
+    const source = new EventSource(url);
+    let connected = false;
+
+    source.addEventListener('status', event => {
+        const data = JSON.parse(event.data);
+        container.querySelectorAll(`[data-animal-id="${data.id}"]`).forEach(card => {
+            applyAnimalStatus(card, data.status, data.label);
+        });
+    });
+    // После переподключения запрашиваем статусы заново: события за время обрыва потеряны
+    source.addEventListener('open', () => {
+        if (connected && container.dataset.availabilityUrl) {
+            refreshAvailability(container);
+        }
+        connected = true;
+    });
+    return source;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-availability-url]').forEach(refreshAvailability);
+    document.querySelectorAll('[data-status-stream-url]').forEach(subscribeToStatusUpdates);
+});
+
+// Подгрузка старых записей истории в профиле.
+// Кнопка: <button data-url="{% url 'api_profile_history' 'reservations' %}"
+//                 data-next-cursor="{{ reservations.next_cursor|default:'' }}"
+//                 data-target="#reservations-history">Показать еще</button>
+const historyRenderers = {
+    reservations: item => `${item.animal.name} — ${item.visit_date} (${item.status_display})`,
+    adoptions: item => `${item.animal.name} — ${item.status_display}`,
+    donations: item => `${item.amount} руб. — ${item.payment_status_display}`
+};
+
+function loadMoreHistory(button) {
+    const url = new URL(button.dataset.url, window.location.origin);
+    const section = url.pathname.split('/').filter(Boolean).pop();
+    const target = document.querySelector(button.dataset.target);
+    url.searchParams.set('cursor', button.dataset.nextCursor);
+    button.disabled = true;
+
+    return fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            data.results.forEach(item => {
+                const row = document.createElement('div');
+                row.className = 'history-item';
+                row.textContent = historyRenderers[section](item);
+                target.appendChild(row);
+            });
+            if (data.next_cursor) {
+                button.dataset.nextCursor = data.next_cursor;
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            button.disabled = false;
+            showMessage('Не удалось загрузить историю', 'error');
+        });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-next-cursor]').forEach(button => {
+        if (!button.dataset.nextCursor) {
+            button.remove();
+            return;
+        }
+        button.addEventListener('click', () => loadMoreHistory(button));
+    });
+});
+
 // Export functions for global use
 window.shelterApp = {
     openLoginModal,
@@ -364,5 +492,8 @@ window.shelterApp = {
     closeSupportModal,
     showMessage,
     sendAjaxRequest,
+    loadMoreHistory,
+    refreshAvailability,
+    subscribeToStatusUpdates,
     scrollToSearch
 };
@@ -0,0 +1,111 @@
+"""
+Полнотекстовый поиск по каталогу животных.
+
+PostgreSQL: поле Animal.search_vector (tsvector) с GIN-индексом и русской
+морфологией. SQLite (разработка и тесты): виртуальная таблица FTS5.
+На остальных СУБД поиск деградирует до icontains.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Animal
+
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'shelter_animal_fts'
+
+# Поля, участвующие в поиске, и их веса
+SEARCH_FIELDS = ('name', 'breed', 'description')
+SEARCH_VECTOR = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('breed', weight='B', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+)
+# Веса колонок FTS5 для bm25() в порядке SEARCH_FIELDS
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def _vendor(using):
+    return connections[using].vendor
+
+
+def _fts_query(query):
+    """Превращает пользовательский ввод в безопасный запрос FTS5 (префиксный поиск по словам)"""
+    words = re.findall(r'\w+', query)
+    return ' '.join('"%s"*' % word for word in words)
+
+
+def update_search_index(animal_ids, using='default'):
+    """Пересчитать поисковый индекс для указанных животных"""
+    animal_ids = list(animal_ids)
+    if not animal_ids:
+        return
+
+    vendor = _vendor(using)
+    if vendor == 'postgresql':
+        Animal.objects.using(using).filter(pk__in=animal_ids).update(search_vector=SEARCH_VECTOR)
+    elif vendor == 'sqlite':
+        rows = Animal.objects.using(using).filter(pk__in=animal_ids).values_list('pk', *SEARCH_FIELDS)
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in animal_ids]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, breed, description) VALUES (%s, %s, %s, %s)',
+                list(rows)
+            )
+
+
+def remove_from_search_index(animal_ids, using='default'):
+    """Удалить животных из поискового индекса (нужно только для FTS5)"""
+    animal_ids = list(animal_ids)
+    if animal_ids and _vendor(using) == 'sqlite':
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in animal_ids]
+            )
+
+
+def search_animals(queryset, query):
+    """
+    Отфильтровать queryset животных по поисковому запросу
+    и отсортировать по релевантности.
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    vendor = _vendor(queryset.db)
+    if vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-created_at')
+
+    if vendor == 'sqlite':
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (fts_query,))
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = "{table}"."id"',
+                (fts_query,)
+            )
+        ).order_by('-search_rank', '-created_at')
+
+    return queryset.filter(
+        Q(name__icontains=query) |
+        Q(description__icontains=query) |
+        Q(breed__icontains=query)
+    )
@@ -0,0 +1,190 @@
+"""
+Смена статусов животных, бронирований, усыновлений и пожертвований,
+массовое добавление животных.
+
+Массовые переходы выполняются фиксированным числом UPDATE в одной
+транзакции независимо от количества выбранных записей; производные
+данные (счетчики статистики, рейтинг доноров, кеш фасетов, живые
+обновления статусов, задача пересчета похожих животных) обновляются здесь же.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Animal, Reservation, Donation
+from .facets import invalidate_facet_counts
+from .search import update_search_index
+from .stats import record_status_changes
+from .leaderboard import leaderboard_entry, record_donation_changes
+from .events import publish_status_changes
+from .tasks import schedule_similar_animals
+
+
+class AnimalUnavailable(Exception):
+    """Животное уже забронировано или усыновлено"""
+
+
+def set_animal_status(queryset, status):
+    """
+    Массово сменить статус животных одним UPDATE.
+
+    queryset.update() не вызывает сигналы, поэтому счетчики
+    обновляются здесь же, в той же транзакции. Возвращает число животных.
+    """
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values_list('pk', 'animal_type', 'status'))
+        if not rows:
+            return 0
+
+        Animal.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+            status=status,
+            updated_at=timezone.now()
+        )
+
+        changes = Counter(
+            (animal_type, old_status)
+            for _, animal_type, old_status in rows if old_status != status
+        )
+        record_status_changes(
+            (animal_type, old_status, status, count)
+            for (animal_type, old_status), count in changes.items()
+        )
+        changed = [pk for pk, _, old_status in rows if old_status != status]
+        publish_status_changes([(pk, status) for pk in changed])
+        if changed:
+            schedule_similar_animals(changed)
+        transaction.on_commit(invalidate_facet_counts)
+
+    return len(rows)
+
+
+def create_animals(animals):
+    """
+    Сохранить новых животных одним bulk_create.
+
+    bulk_create не вызывает сигналы, поэтому поисковый индекс, счетчики,
+    живые обновления и пересчет похожих животных обновляются здесь же.
+    Возвращает созданных животных с pk.
+    """
+    if not animals:
+        return []
+    with transaction.atomic():
+        animals = Animal.objects.bulk_create(animals)
+        ids = [animal.pk for animal in animals]
+        update_search_index(ids)
+        record_status_changes(
+            (animal_type, None, status, count)
+            for (animal_type, status), count in Counter(
+                (animal.animal_type, animal.status) for animal in animals
+            ).items()
+        )
+        publish_status_changes([(animal.pk, animal.status) for animal in animals])
+        schedule_similar_animals(ids)
+        transaction.on_commit(invalidate_facet_counts)
+    return animals
+
+
+def _transition(queryset, status, animal_status, animal_filters=None):
+    """
+    Сменить статус бронирований или усыновлений и статус их животных.
+
+    Запросов всегда одинаковое число: выборка ключей, блокировка строк,
+    UPDATE записей и UPDATE животных (плюс счетчики по типам).
+    """
+    model = queryset.model
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return 0
+
+    with transaction.atomic():
+        rows = list(
+            model.objects.filter(pk__in=pks).select_for_update().values_list('pk', 'animal_id')
+        )
+        model.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+            status=status,
+            updated_at=timezone.now()
+        )
+        set_animal_status(
+            Animal.objects.filter(
+                pk__in={animal_id for _, animal_id in rows}, **(animal_filters or {})
+            ),
+            animal_status
+        )
+    return len(rows)
+
+
+def cancel_reservations(queryset):
+    """Отменить бронирования и вернуть забронированных животных в приют"""
+    return _transition(queryset, 'cancelled', 'available', {'status': 'reserved'})
+
+
+def approve_adoptions(queryset):
+    """Одобрить усыновления; животные становятся усыновленными"""
+    return _transition(queryset, 'approved', 'adopted')
+
+
+def reject_adoptions(queryset):
+    """Отклонить усыновления; животные возвращаются в приют"""
+    return _transition(queryset, 'rejected', 'available')
+
+
+def claim_animal(animal, **reservation_fields):
+    """
+    Забронировать доступное животное.
+
+    Статус меняется условным UPDATE ... WHERE status='available', бронь
+    создается в той же транзакции. Из одновременных запросов на одно
+    животное UPDATE затронет строку только у одного, остальные получат
+    AnimalUnavailable и не будут держать блокировок. Счетчики статистики
+    обновляются после коммита, чтобы брони не ждали блокировки их строки.
+    """
+    with transaction.atomic():
+        claimed = Animal.objects.filter(pk=animal.pk, status='available').update(
+            status='reserved',
+            updated_at=timezone.now()
+        )
+        if not claimed:
+            raise AnimalUnavailable(animal.pk)
+
+        reservation = Reservation.objects.create(animal=animal, **reservation_fields)
+        transaction.on_commit(lambda: record_status_changes(
+            [(animal.animal_type, 'available', 'reserved', 1)]
+        ))
+        publish_status_changes([(animal.pk, 'reserved')])
+        schedule_similar_animals([animal.pk])
+        transaction.on_commit(invalidate_facet_counts)
+
+    animal.status = 'reserved'
+    return reservation
+
+
+def set_donation_status(queryset, payment_status):
+    """
+    Массово сменить статус оплаты пожертвований одним UPDATE.
+
+    Рейтинг доноров обновляется в той же транзакции. Возвращает число пожертвований.
+    """
+    # Блокируются только строки пожертвований, без JOIN из queryset админки
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return 0
+
+    with transaction.atomic():
+        rows = list(Donation.objects.filter(pk__in=pks).select_for_update().values_list(
+            'pk', 'user_id', 'amount', 'is_anonymous', 'payment_status'
+        ))
+
+        Donation.objects.filter(pk__in=[row[0] for row in rows]).update(
+            payment_status=payment_status,
+            updated_at=timezone.now()
+        )
+        record_donation_changes(
+            (
+                leaderboard_entry(user_id, amount, is_anonymous, old_status),
+                leaderboard_entry(user_id, amount, is_anonymous, payment_status),
+            )
+            for _, user_id, amount, is_anonymous, old_status in rows
+        )
+
+    return len(rows)
@@ -0,0 +1,222 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Animal, CustomUser, Reservation, SupportRequest, Adoption, Donation, SimilarAnimal
+from .search import SEARCH_FIELDS, update_search_index, remove_from_search_index
+from .facets import FACET_FIELDS, invalidate_facet_counts
+from .stats import record_status_changes
+from .leaderboard import leaderboard_entry, record_donation_changes
+from .events import publish_status_changes
+from .recommendations import FEATURE_FIELDS
+from .tasks import schedule_similar_animals
+from .renditions import update_renditions, delete_renditions
+from .admin_search import (
+    build_search_document, dependent_documents, local_fields, refresh_search_documents
+)
+
+
+@receiver(post_save, sender=Animal)
+def sync_animal_search_index(sender, instance, using, update_fields=None, **kwargs):
+    """Обновить поисковый индекс после сохранения животного"""
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    update_search_index([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Animal)
+def drop_animal_search_index(sender, instance, using, **kwargs):
+    """Удалить животное из поискового индекса"""
+    remove_from_search_index([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def reset_animal_facet_counts(sender, instance, update_fields=None, **kwargs):
+    """Сбросить кеш фасетных счетчиков при изменении статуса или атрибутов"""
+    if update_fields is not None and not set(update_fields) & ({'status'} | set(FACET_FIELDS)):
+        return
+    invalidate_facet_counts()
+
+
+@receiver(pre_save, sender=Animal)
+def remember_animal_status(sender, instance, using, update_fields=None, **kwargs):
+    """Запомнить статус и признаки сходства животного до сохранения"""
+    instance._previous_status = None
+    instance._previous_features = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & ({'status'} | set(FEATURE_FIELDS)):
+        return
+    previous = Animal.objects.using(using).filter(
+        pk=instance.pk
+    ).values('status', *FEATURE_FIELDS).first()
+    if previous is not None:
+        instance._previous_status = (previous['animal_type'], previous['status'])
+        instance._previous_features = [previous[field] for field in ['status'] + FEATURE_FIELDS]
+
+
+@receiver(post_save, sender=Animal)
+def count_animal_status(sender, instance, created, **kwargs):
+    """Обновить счетчики статистики при добавлении животного или смене статуса"""
+    if created:
+        record_status_changes([(instance.animal_type, None, instance.status, 1)])
+        return
+    previous = getattr(instance, '_previous_status', None)
+    if previous and previous != (instance.animal_type, instance.status):
+        old_type, old_status = previous
+        record_status_changes([
+            (old_type, old_status, None, 1),
+            (instance.animal_type, None, instance.status, 1),
+        ])
+
+
+@receiver(post_save, sender=Animal)
+def publish_animal_status(sender, instance, created, using, **kwargs):
+    """Отправить новый статус животного подписчикам SSE"""
+    previous = getattr(instance, '_previous_status', None)
+    if created or (previous and previous[1] != instance.status):
+        publish_status_changes([(instance.pk, instance.status)], using=using)
+
+
+@receiver(post_delete, sender=Animal)
+def uncount_animal(sender, instance, **kwargs):
+    """Убрать удаленное животное из счетчиков"""
+    record_status_changes([(instance.animal_type, instance.status, None, 1)])
+
+
+@receiver(post_save, sender=Animal)
+def queue_similar_animals_update(sender, instance, created, **kwargs):
+    """Пересчитать похожих животных для нового животного или после смены статуса и признаков"""
+    previous = getattr(instance, '_previous_features', None)
+    current = [getattr(instance, field) for field in ['status'] + FEATURE_FIELDS]
+    if created or (previous is not None and previous != current):
+        schedule_similar_animals([instance.pk])
+
+
+@receiver(pre_delete, sender=Animal)
+def queue_similar_animals_cleanup(sender, instance, using, **kwargs):
+    """
+    Пересчитать списки, в которых было удаляемое животное (его записи удалятся
+    каскадом); само животное передается, чтобы воркер убрал его из кеша векторов.
+    """
+    affected = list(SimilarAnimal.objects.using(using).filter(
+        neighbor=instance
+    ).exclude(animal=instance).values_list('animal_id', flat=True))
+    schedule_similar_animals([instance.pk], affected)
+
+
+IMAGE_FIELDS = {
+    Animal: 'photo',
+    CustomUser: 'avatar',
+}
+
+
+@receiver(pre_save, sender=Animal)
+@receiver(pre_save, sender=CustomUser)
+def detect_image_upload(sender, instance, **kwargs):
+    """Отметить, что изображение было заменено или удалено"""
+    field_name = IMAGE_FIELDS[sender]
+    field_file = getattr(instance, field_name)
+    renditions = getattr(instance, f'{field_name}_renditions') or {}
+    # Новый файл еще не сохранен в хранилище (_committed=False)
+    instance._image_changed = bool(field_file and not field_file._committed) or (
+        not field_file and bool(renditions)
+    )
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_save, sender=CustomUser)
+def generate_image_renditions(sender, instance, **kwargs):
+    """Создать превью загруженного изображения после фиксации транзакции"""
+    if getattr(instance, '_image_changed', False):
+        instance._image_changed = False
+        field_name = IMAGE_FIELDS[sender]
+        transaction.on_commit(lambda: update_renditions(instance, field_name))
+
+
+@receiver(post_delete, sender=Animal)
+@receiver(post_delete, sender=CustomUser)
+def drop_image_renditions(sender, instance, **kwargs):
+    """Удалить превью вместе с записью"""
+    field_name = IMAGE_FIELDS[sender]
+    renditions = getattr(instance, f'{field_name}_renditions')
+    if renditions:
+        storage = getattr(instance, field_name).storage
+        transaction.on_commit(lambda: delete_renditions(storage, renditions))
+
+
+@receiver(pre_save, sender=CustomUser)
+@receiver(pre_save, sender=Reservation)
+@receiver(pre_save, sender=SupportRequest)
+@receiver(pre_save, sender=Adoption)
+@receiver(pre_save, sender=Donation)
+def fill_search_document(sender, instance, update_fields=None, **kwargs):
+    """Собрать текст для поиска в админке перед сохранением"""
+    if update_fields is None or 'search_document' in update_fields:
+        instance.search_document = build_search_document(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=Reservation)
+@receiver(post_save, sender=SupportRequest)
+@receiver(post_save, sender=Adoption)
+@receiver(post_save, sender=Donation)
+def refresh_partial_search_document(sender, instance, using, update_fields=None, **kwargs):
+    """При сохранении части полей пересчитать текст для поиска отдельным UPDATE"""
+    if update_fields is None or 'search_document' in update_fields:
+        return
+    if set(update_fields) & local_fields(sender):
+        refresh_search_documents(sender._default_manager.using(using).filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_save, sender=CustomUser)
+def refresh_related_search_documents(sender, instance, using, created, update_fields=None, **kwargs):
+    """Обновить текст для поиска у записей, в которые попадают поля этого объекта"""
+    if created:
+        return
+    for model, relation, fields in dependent_documents(sender):
+        if update_fields is None or set(update_fields) & fields:
+            refresh_search_documents(
+                model._default_manager.using(using).filter(**{relation: instance.pk})
+            )
+
+
+LEADERBOARD_FIELDS = {'user', 'user_id', 'amount', 'is_anonymous', 'payment_status'}
+
+
+def donation_entry(donation):
+    return leaderboard_entry(
+        donation.user_id, donation.amount, donation.is_anonymous, donation.payment_status
+    )
+
+
+@receiver(pre_save, sender=Donation)
+def remember_donation_entry(sender, instance, using, update_fields=None, **kwargs):
+    """Запомнить, как пожертвование учитывалось в рейтинге до сохранения"""
+    instance._previous_entry = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & LEADERBOARD_FIELDS:
+        instance._previous_entry = donation_entry(instance)
+        return
+    previous = Donation.objects.using(using).filter(pk=instance.pk).values_list(
+        'user_id', 'amount', 'is_anonymous', 'payment_status'
+    ).first()
+    if previous:
+        instance._previous_entry = leaderboard_entry(*previous)
+
+
+@receiver(post_save, sender=Donation)
+def count_donation(sender, instance, **kwargs):
+    """Обновить рейтинг доноров после оплаты, возврата или правки пожертвования"""
+    record_donation_changes([
+        (getattr(instance, '_previous_entry', None), donation_entry(instance))
+    ])
+
+
+@receiver(post_delete, sender=Donation)
+def uncount_donation(sender, instance, **kwargs):
+    """Убрать удаленное пожертвование из рейтинга"""
+    record_donation_changes([(donation_entry(instance), None)])
@@ -0,0 +1,86 @@
+"""
+Счетчики животных по типам и статусам (таблица AnimalStatistics).
+
+Каждое изменение статуса применяется к строке своего типа атомарным
+UPDATE ... SET x = x + n. Итоговой строки нет: счетчики по всему приюту
+(AnimalStatistics.ALL) суммируются при чтении, так что изменения животных
+разных типов не ждут блокировки одной общей строки.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Animal, AnimalStatistics
+
+
+STATUS_FIELDS = [status for status, _ in Animal.STATUS_CHOICES]
+
+
+def record_status_changes(changes):
+    """
+    Применить изменения к счетчикам.
+
+    changes: итерируемое из (animal_type, old_status, new_status, count);
+    old_status=None означает новое животное, new_status=None — удаленное.
+    """
+    deltas = defaultdict(Counter)
+    for animal_type, old_status, new_status, count in changes:
+        if old_status is None:
+            deltas[animal_type]['total'] += count
+        else:
+            deltas[animal_type][old_status] -= count
+        if new_status is None:
+            deltas[animal_type]['total'] -= count
+        else:
+            deltas[animal_type][new_status] += count
+
+    with transaction.atomic():
+        # Фиксированный порядок строк исключает взаимные блокировки
+        for key in sorted(deltas):
+            updates = {
+                field: F(field) + delta
+                for field, delta in deltas[key].items() if delta
+            }
+            if not updates:
+                continue
+            if not AnimalStatistics.objects.filter(pk=key).update(**updates):
+                AnimalStatistics.objects.bulk_create(
+                    [AnimalStatistics(pk=key)], ignore_conflicts=True
+                )
+                AnimalStatistics.objects.filter(pk=key).update(**updates)
+
+
+def get_animal_statistics(animal_type=AnimalStatistics.ALL):
+    """Счетчики для типа животного (по умолчанию — по всему приюту)"""
+    if animal_type == AnimalStatistics.ALL:
+        fields = ['total'] + STATUS_FIELDS
+        sums = AnimalStatistics.objects.aggregate(**{field: Sum(field) for field in fields})
+        return AnimalStatistics(
+            pk=AnimalStatistics.ALL,
+            **{field: sums[field] or 0 for field in fields}
+        )
+    try:
+        return AnimalStatistics.objects.get(pk=animal_type)
+    except AnimalStatistics.DoesNotExist:
+        return AnimalStatistics(pk=animal_type)
+
+
+def rebuild_animal_statistics():
+    """Пересчитать все счетчики с нуля по таблице животных"""
+    with transaction.atomic():
+        rows = defaultdict(Counter)
+        for animal_type, _ in Animal.ANIMAL_TYPES:
+            rows[animal_type] = Counter()
+        grouped = Animal.objects.values('animal_type', 'status').annotate(
+            count=Count('pk')
+        ).order_by()
+        for row in grouped:
+            rows[row['animal_type']]['total'] += row['count']
+            if row['status'] in STATUS_FIELDS:
+                rows[row['animal_type']][row['status']] += row['count']
+
+        AnimalStatistics.objects.all().delete()
+        return AnimalStatistics.objects.bulk_create([
+            AnimalStatistics(pk=key, **counts) for key, counts in sorted(rows.items())
+        ])
@@ -0,0 +1,105 @@
+"""
+Фоновые задачи: письма посетителям, уведомления сотрудникам приюта и
+пересчет рекомендаций похожих животных.
+
+Ставятся в очередь из представлений через jobs.enqueue() и выполняются
+воркером manage.py run_jobs. Если запись успели удалить, задача ничего не делает.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import mail_managers, send_mail
+from django.db import transaction
+
+from .jobs import absorb_pending_jobs, enqueue, task
+from .models import Reservation, SupportRequest, Donation
+from .recommendations import refresh_similar_animals
+
+
+@task
+def send_reservation_confirmation(reservation_id):
+    """Письмо посетителю о принятой заявке на встречу"""
+    reservation = Reservation.objects.select_related('animal').filter(pk=reservation_id).first()
+    if reservation is None or not reservation.email:
+        return
+    send_mail(
+        f'Заявка на встречу с {reservation.animal.name}',
+        f'Здравствуйте, {reservation.name}!\n\n'
+        f'Мы получили вашу заявку на встречу с {reservation.animal.name} '
+        f'{reservation.visit_date:%d.%m.%Y}. Мы свяжемся с вами для подтверждения.\n\n'
+        'Приют "Верные друзья"',
+        None,
+        [reservation.email],
+    )
+
+
+@task
+def notify_staff_about_reservation(reservation_id):
+    """Уведомление сотрудникам о новой заявке на встречу"""
+    reservation = Reservation.objects.select_related('animal').filter(pk=reservation_id).first()
+    if reservation is None:
+        return
+    mail_managers(
+        f'Новая бронь: {reservation.animal.name}',
+        f'{reservation.name}, {reservation.phone}, {reservation.email}\n'
+        f'Дата посещения: {reservation.visit_date:%d.%m.%Y}\n\n{reservation.comment}',
+    )
+
+
+@task
+def notify_staff_about_support_request(support_request_id):
+    """Уведомление сотрудникам о новом обращении в поддержку"""
+    support_request = SupportRequest.objects.filter(pk=support_request_id).first()
+    if support_request is None:
+        return
+    mail_managers(
+        f'Обращение: {support_request.get_subject_display()}',
+        f'{support_request.name}, {support_request.email}\n\n{support_request.message}',
+    )
+
+
+@task
+def send_donation_confirmation(donation_id):
+    """Письмо донору о принятом пожертвовании"""
+    donation = Donation.objects.filter(pk=donation_id).first()
+    if donation is None or not donation.email:
+        return
+    send_mail(
+        'Спасибо за вашу поддержку!',
+        f'Здравствуйте{", " + donation.name if donation.name else ""}!\n\n'
+        f'Мы получили ваше пожертвование на сумму {donation.amount} руб. '
+        'Спасибо, что помогаете нашим подопечным.\n\n'
+        'Приют "Верные друзья"',
+        None,
+        [donation.email],
+    )
+
+
+@task
+def update_similar_animals(animal_ids, affected_ids=()):
+    """
+    Пересчитать похожих животных после добавления, удаления или изменения животных.
+
+    Заодно выполняет все ожидающие задачи update_similar_animals: поток
+    бронирований дает один пересчет на пачку, а не на каждое животное.
+    """
+    animal_ids = set(animal_ids)
+    affected_ids = set(affected_ids)
+    with transaction.atomic():
+        for payload in absorb_pending_jobs(update_similar_animals):
+            animal_ids.update(payload.get('animal_ids', ()))
+            affected_ids.update(payload.get('affected_ids', ()))
+        refresh_similar_animals(sorted(animal_ids), sorted(affected_ids))
+
+
+def schedule_similar_animals(animal_ids, affected_ids=()):
+    """
+    Поставить пересчет похожих животных в очередь с задержкой
+    SHELTER_SIMILAR_REFRESH_DELAY секунд, чтобы изменения за это время
+    пересчитались одной задачей.
+    """
+    delay = getattr(settings, 'SHELTER_SIMILAR_REFRESH_DELAY', 5)
+    return enqueue(
+        update_similar_animals, delay=timedelta(seconds=delay) if delay else None,
+        animal_ids=list(animal_ids), affected_ids=list(affected_ids)
+    )
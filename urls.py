@@ -41,7 +41,15 @@ urlpatterns = [
     
     # API endpoints
     path('api/animal/<int:animal_id>/check/', views.api_check_availability, name='api_check_availability'),
+    path('api/animals/availability/', views.api_check_availability_batch, name='api_check_availability_batch'),
+    path('api/animals/status-stream/', views.api_animal_status_stream, name='api_animal_status_stream'),
     path('api/reservation/<int:reservation_id>/cancel/', views.api_cancel_reservation, name='api_cancel_reservation'),
+    path('api/profile/history/<str:section>/', views.api_profile_history, name='api_profile_history'),
+    
+    # Мониторинг
+    path('metrics/', views.metrics, name='metrics'),
+    path('staff/profiles/', views.request_profiles, name='request_profiles'),
+    path('staff/profiles/<str:profile_id>/', views.download_request_profile, name='download_request_profile'),
 ]
 
 # Добавляем возможность загрузки медиа файлов в режиме разработки
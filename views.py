@@ -1,17 +1,39 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, authenticate, logout
+from django.urls import reverse
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib import admin
 from django.contrib import messages
-from django.db.models import Q
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.views.decorators.http import require_POST
+from django.utils.cache import patch_cache_control
+from django.conf import settings
+from django.template.response import TemplateResponse
 from datetime import datetime, timedelta
 
-from .models import Animal, Reservation, SupportRequest, Adoption, Donation, CustomUser
+from .models import Animal, Reservation, SupportRequest, Adoption, Donation
+from .search import search_animals
+from .pagination import CursorPaginator
+from .stats import get_animal_statistics
+from .recommendations import get_similar_animals
+from .leaderboard import get_top_donors
+from .jobs import enqueue
+from .events import ensure_listener, parse_ids, stream_enabled, stream_status_events
+from .tasks import (
+    send_reservation_confirmation, notify_staff_about_reservation,
+    notify_staff_about_support_request, send_donation_confirmation
+)
+from .services import AnimalUnavailable, claim_animal, cancel_reservations
+from .facets import get_facet_counts
+from .auth_backends import authenticate_by_email, session_backend
+from .metrics import metrics_allowed, render_metrics
+from .profiling import MODES, PROFILE_PARAM, list_profiles, make_token, open_profile, profile_dir, token_max_age
 from .forms import (
     RegistrationForm, LoginForm, ReservationForm, 
-    SupportRequestForm, ProfileUpdateForm
+    SupportRequestForm, ProfileUpdateForm, AnimalFilterForm
 )
 
 
@@ -22,6 +44,8 @@ def home(request):
     
     context = {
         'animals': animals,
+        # Подписка на живые статусы только там, где поток не занимает воркер
+        'live_status': stream_enabled(),
     }
     return render(request, 'shelter/index.html', context)
 
@@ -46,26 +70,37 @@ def animals_list(request):
     if size:
         animals = animals.filter(size=size)
     if search:
-        animals = animals.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search) |
-            Q(breed__icontains=search)
-        )
+        # Полнотекстовый поиск с сортировкой по релевантности
+        animals = search_animals(animals, search)
+    
+    # Пагинация: курсорная (без COUNT и OFFSET) включается параметром ?cursor=
+    # или настройкой SHELTER_CURSOR_PAGINATION
+    cursor_mode = 'cursor' in request.GET or getattr(settings, 'SHELTER_CURSOR_PAGINATION', False)
+    if cursor_mode:
+        paginator = CursorPaginator(animals, 12)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    else:
+        paginator = Paginator(animals, 12)  # 12 животных на странице
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     
-    # Пагинация
-    paginator = Paginator(animals, 12)  # 12 животных на странице
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    filters = {
+        'animal_type': animal_type,
+        'age': age,
+        'gender': gender,
+        'size': size,
+        'search': search,
+    }
+    
+    # Количество животных для каждого варианта фильтров (один запрос, кешируется)
+    facet_counts = get_facet_counts(filters, search)
     
     context = {
         'animals': page_obj,
-        'filters': {
-            'animal_type': animal_type,
-            'age': age,
-            'gender': gender,
-            'size': size,
-            'search': search,
-        }
+        'cursor_mode': cursor_mode,
+        'filters': filters,
+        'facet_counts': facet_counts,
+        'filter_form': AnimalFilterForm(request.GET or None, facet_counts=facet_counts),
     }
     return render(request, 'shelter/animals_list.html', context)
 
@@ -74,11 +109,8 @@ def animal_detail(request, pk):
     """Детальная страница животного"""
     animal = get_object_or_404(Animal, pk=pk)
     
-    # Похожие животные
-    similar_animals = Animal.objects.filter(
-        animal_type=animal.animal_type,
-        status='available'
-    ).exclude(pk=pk)[:4]
+    # Похожие животные: готовый список из SimilarAnimal, без расчетов в запросе
+    similar_animals = get_similar_animals(animal, 4)
     
     context = {
         'animal': animal,
@@ -100,7 +132,9 @@ def register(request):
             user.save()
             
             # Автоматический вход после регистрации
-            login(request, user)
+            # authenticate() не вызывался: бэкенд нужно указать явно,
+            # и только из подключенных, иначе сессия не переживет запрос
+            login(request, user, backend=session_backend())
             messages.success(request, 'Регистрация прошла успешно!')
             return redirect('home')
         else:
@@ -121,19 +155,17 @@ def user_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
         
-        try:
-            user = CustomUser.objects.get(email=email)
-            user = authenticate(request, username=user.username, password=password)
-            
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Добро пожаловать, {user.get_full_name()}!')
-                next_url = request.GET.get('next', 'home')
-                return redirect(next_url)
-            else:
-                messages.error(request, 'Неверный email или пароль')
-        except CustomUser.DoesNotExist:
-            messages.error(request, 'Пользователь с таким email не найден')
+        # Один запрос по индексу lower(email); неизвестный email и неверный
+        # пароль не различаются, чтобы по ответу нельзя было перебирать адреса
+        user = authenticate_by_email(request, email, password)
+        
+        if user is not None:
+            login(request, user)
+            messages.success(request, f'Добро пожаловать, {user.get_full_name()}!')
+            next_url = request.GET.get('next', 'home')
+            return redirect(next_url)
+        else:
+            messages.error(request, 'Неверный email или пароль')
     
     return redirect('home')
 
@@ -145,13 +177,23 @@ def user_logout(request):
     return redirect('home')
 
 
+def profile_history(user):
+    """Разделы истории в профиле; связанные объекты загружаются через JOIN"""
+    return {
+        'reservations': Reservation.objects.filter(user=user).select_related('animal'),
+        'adoptions': Adoption.objects.filter(user=user).select_related('animal', 'user'),
+        'donations': Donation.objects.filter(user=user).select_related('user'),
+    }
+
+
+def profile_history_limit():
+    return getattr(settings, 'SHELTER_PROFILE_HISTORY_LIMIT', 5)
+
+
 @login_required
 def profile(request):
     """Профиль пользователя"""
     user = request.user
-    reservations = Reservation.objects.filter(user=user).order_by('-created_at')
-    adoptions = Adoption.objects.filter(user=user).order_by('-created_at')
-    donations = Donation.objects.filter(user=user).order_by('-created_at')
     
     if request.method == 'POST':
         form = ProfileUpdateForm(request.POST, request.FILES, instance=user)
@@ -162,12 +204,11 @@ def profile(request):
     else:
         form = ProfileUpdateForm(instance=user)
     
-    context = {
-        'form': form,
-        'reservations': reservations,
-        'adoptions': adoptions,
-        'donations': donations,
-    }
+    # Только последние записи каждого раздела, остальные подгружаются
+    # через api_profile_history по курсору page.next_cursor
+    context = {'form': form}
+    for section, queryset in profile_history(user).items():
+        context[section] = CursorPaginator(queryset, profile_history_limit()).get_page(None)
     return render(request, 'shelter/profile.html', context)
 
 
@@ -177,7 +218,7 @@ def create_reservation(request):
     animal_id = request.POST.get('animal_id')
     animal = get_object_or_404(Animal, pk=animal_id)
     
-    # Проверка доступности животного
+    # Проверка доступности животного (окончательно проверяется при бронировании)
     if animal.status != 'available':
         messages.error(request, 'К сожалению, это животное уже недоступно для бронирования')
         return redirect('animal_detail', pk=animal_id)
@@ -193,20 +234,24 @@ def create_reservation(request):
         messages.error(request, 'Неверный формат даты')
         return redirect('animal_detail', pk=animal_id)
     
-    # Создание бронирования
-    reservation = Reservation.objects.create(
-        animal=animal,
-        user=request.user if request.user.is_authenticated else None,
-        name=request.POST.get('name'),
-        phone=request.POST.get('phone'),
-        email=request.POST.get('email'),
-        visit_date=visit_date,
-        comment=request.POST.get('comment', '')
-    )
+    # Создание бронирования: статус животного меняется атомарно вместе с созданием брони
+    try:
+        reservation = claim_animal(
+            animal,
+            user=request.user if request.user.is_authenticated else None,
+            name=request.POST.get('name'),
+            phone=request.POST.get('phone'),
+            email=request.POST.get('email'),
+            visit_date=visit_date,
+            comment=request.POST.get('comment', '')
+        )
+    except AnimalUnavailable:
+        messages.error(request, 'К сожалению, это животное уже забронировано')
+        return redirect('animal_detail', pk=animal_id)
     
-    # Обновление статуса животного
-    animal.status = 'reserved'
-    animal.save()
+    # Письма отправляет воркер очереди, посетитель не ждет SMTP
+    enqueue(send_reservation_confirmation, reservation_id=reservation.pk)
+    enqueue(notify_staff_about_reservation, reservation_id=reservation.pk)
     
     messages.success(
         request, 
@@ -227,6 +272,7 @@ def support_request(request):
         subject=request.POST.get('subject'),
         message=request.POST.get('message')
     )
+    enqueue(notify_staff_about_support_request, support_request_id=support_req.pk)
     
     messages.success(
         request,
@@ -238,15 +284,14 @@ def support_request(request):
 
 def about(request):
     """Страница о приюте"""
-    # Статистика
-    total_animals = Animal.objects.count()
-    adopted_animals = Animal.objects.filter(status='adopted').count()
-    available_animals = Animal.objects.filter(status='available').count()
+    # Статистика из денормализованных счетчиков (сумма по нескольким строкам типов)
+    statistics = get_animal_statistics()
     
     context = {
-        'total_animals': total_animals,
-        'adopted_animals': adopted_animals,
-        'available_animals': available_animals,
+        'total_animals': statistics.total,
+        'adopted_animals': statistics.adopted,
+        'available_animals': statistics.available,
+        'statistics': statistics,
     }
     return render(request, 'shelter/about.html', context)
 
@@ -279,16 +324,15 @@ def donations_page(request):
         )
         
         # Здесь должна быть интеграция с платежной системой
-        # Например: Yookassa, Stripe, PayPal и т.д.
+        # Например: Yookassa, Stripe, PayPal и т.д. Вызовы платежного API,
+        # как и письма, выполняются фоновыми задачами (см. tasks.py)
+        enqueue(send_donation_confirmation, donation_id=donation.pk)
         
         messages.success(request, 'Спасибо за вашу поддержку!')
         return redirect('donations')
     
-    # Топ доноров
-    top_donors = Donation.objects.filter(
-        payment_status='completed',
-        is_anonymous=False
-    ).exclude(user=None).values('user__first_name', 'user__last_name').distinct()[:10]
+    # Топ доноров по сумме оплаченных пожертвований
+    top_donors = get_top_donors(10)
     
     context = {
         'top_donors': top_donors,
@@ -324,28 +368,78 @@ def privacy(request):
 # API endpoints для AJAX запросов
 def api_check_availability(request, animal_id):
     """Проверка доступности животного"""
-    animal = get_object_or_404(Animal, pk=animal_id)
+    status = Animal.objects.filter(pk=animal_id).values_list('status', flat=True).first()
+    if status is None:
+        raise Http404('Животное не найдено')
     
     return JsonResponse({
-        'available': animal.status == 'available',
-        'status': animal.get_status_display()
+        'available': status == 'available',
+        'status': dict(Animal.STATUS_CHOICES).get(status, status)
+    })
+
+
+def api_check_availability_batch(request):
+    """
+    Статусы нескольких животных одним запросом: ?ids=1,2,3.
+    
+    Ответ: {"statuses": {"1": "available", ...}, "labels": {"available": "В приюте", ...}};
+    несуществующие id в ответ не попадают.
+    """
+    limit = getattr(settings, 'SHELTER_AVAILABILITY_BATCH_LIMIT', 100)
+    try:
+        ids = sorted(parse_ids(request.GET.get('ids')) or ())
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный список id'}, status=400)
+    if len(ids) > limit:
+        return JsonResponse({'error': f'Не больше {limit} id за запрос'}, status=400)
+    
+    statuses = dict(Animal.objects.filter(pk__in=ids).values_list('pk', 'status')) if ids else {}
+    labels = dict(Animal.STATUS_CHOICES)
+    response = JsonResponse({
+        'statuses': {str(pk): status for pk, status in statuses.items()},
+        'labels': {status: labels.get(status, status) for status in set(statuses.values())},
     })
+    # Статусы меняются редко, короткий TTL снимает повторные запросы
+    patch_cache_control(
+        response, public=True, max_age=getattr(settings, 'SHELTER_AVAILABILITY_CACHE_TTL', 15)
+    )
+    return response
+
+
+async def api_animal_status_stream(request):
+    """
+    Server-sent events с новыми статусами животных (?ids=1,2,3 — только для этих животных).
+    
+    Под ASGI в продакшне этот URL перехватывает events.with_status_stream,
+    чтобы ожидающие клиенты не занимали потоки (см. events.py). Без
+    SHELTER_LIVE_STATUS и под WSGI — 204: бесконечный ответ занял бы воркер.
+    """
+    if not stream_enabled() or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    try:
+        ids = parse_ids(request.GET.get('ids'))
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный список id'}, status=400)
+    
+    ensure_listener()
+    response = StreamingHttpResponse(stream_status_events(ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Запрет буферизации ответа в nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
 def api_cancel_reservation(request, reservation_id):
     """Отмена бронирования"""
     if request.method == 'POST':
-        reservation = get_object_or_404(Reservation, pk=reservation_id, user=request.user)
-        
-        # Обновляем статус животного
-        animal = reservation.animal
-        animal.status = 'available'
-        animal.save()
-        
-        # Отменяем бронирование
-        reservation.status = 'cancelled'
-        reservation.save()
+        # Отменяем бронирование и возвращаем животное в приют
+        cancelled = cancel_reservations(
+            Reservation.objects.filter(pk=reservation_id, user=request.user)
+        )
+        if not cancelled:
+            raise Http404('Бронирование не найдено')
         
         return JsonResponse({
             'success': True,
@@ -353,4 +447,92 @@ def api_cancel_reservation(request, reservation_id):
         })
     
     return JsonResponse({'success': False}, status=400)
+
+
+def serialize_animal(animal):
+    return {
+        'id': animal.pk,
+        'name': animal.name,
+        'url': reverse('animal_detail', args=[animal.pk]),
+    }
+
+
+HISTORY_SERIALIZERS = {
+    'reservations': lambda reservation: {
+        'id': reservation.pk,
+        'animal': serialize_animal(reservation.animal),
+        'visit_date': reservation.visit_date.isoformat(),
+        'status': reservation.status,
+        'status_display': reservation.get_status_display(),
+        'created_at': reservation.created_at.isoformat(),
+    },
+    'adoptions': lambda adoption: {
+        'id': adoption.pk,
+        'animal': serialize_animal(adoption.animal),
+        'adoption_date': adoption.adoption_date.isoformat() if adoption.adoption_date else None,
+        'status': adoption.status,
+        'status_display': adoption.get_status_display(),
+        'created_at': adoption.created_at.isoformat(),
+    },
+    'donations': lambda donation: {
+        'id': donation.pk,
+        'amount': str(donation.amount),
+        'payment_status': donation.payment_status,
+        'payment_status_display': donation.get_payment_status_display(),
+        'created_at': donation.created_at.isoformat(),
+    },
+}
+
+
+@login_required
+def api_profile_history(request, section):
+    """Более старые записи раздела истории профиля"""
+    history = profile_history(request.user)
+    if section not in history:
+        raise Http404('Раздел не найден')
     
+    page = CursorPaginator(history[section], profile_history_limit()).get_page(
+        request.GET.get('cursor')
+    )
+    return JsonResponse({
+        'results': [HISTORY_SERIALIZERS[section](obj) for obj in page],
+        'next_cursor': page.next_cursor,
+    })
+
+
+def metrics(request):
+    """Метрики запросов в формате Prometheus"""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+def request_profiles(request):
+    """Токены для профилирования и список последних профилей"""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'enabled': bool(profile_dir()),
+        'token_age': token_max_age(),
+        'param': PROFILE_PARAM,
+        'modes': [
+            {'title': title, 'token': make_token(request.user, mode)}
+            for mode, (_, title) in MODES.items()
+        ],
+        'profiles': list_profiles(),
+    }
+    return TemplateResponse(request, 'admin/shelter/request_profiles.html', context)
+
+
+@staff_member_required
+def download_request_profile(request, profile_id):
+    """Файл профиля: collapsed stacks или pstats"""
+    found = open_profile(profile_id)
+    if found is None:
+        raise Http404('Профиль не найден')
+    fp, meta = found
+    return FileResponse(
+        fp, as_attachment=True, filename=f"{profile_id}{MODES[meta['mode']][0]}",
+        content_type='application/octet-stream'
+    )